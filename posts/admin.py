@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group
 
 
@@ -9,6 +10,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE '%...%'.
+        if not search_term.strip() or not search.enabled():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(search_entry__match=search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
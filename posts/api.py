@@ -0,0 +1,227 @@
+"""JSON API для чтения лент и постов.
+
+Ленты отдаются страницами по курсору: в ответе есть results и ссылки
+next/previous. Запросы те же, что у HTML-страниц, но выбираются только
+колонки из serializers.POST_FIELDS. Анонимные ответы кешируются и
+проверяются по ETag так же, как страницы (posts/cache.py); для
+авторизованных ETag считается по телу ответа.
+
+Единственная запись — импорт NDJSON (posts/importer.py), он доступен
+только сотрудникам: записи создаются от имени любых авторов. Выгрузка
+(posts/exporter.py) отдаётся потоком: пользователь может выгрузить
+свои посты, сотрудники — любого пользователя и любую группу.
+"""
+from django.http import StreamingHttpResponse
+from django.middleware.http import ConditionalGetMiddleware
+from django.urls import reverse
+from django.utils.decorators import decorator_from_middleware
+from django.utils.http import urlencode
+from django.views.decorators.http import require_GET, require_POST
+
+from . import cache as feed_cache
+from . import exporter, importer, timeline
+from .constants import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+from .models import Group, Post, User
+from .paginators import COMMENT_ORDERINGS, FEED_ORDERING, CursorPaginator
+from .serializers import (
+    COMMENT_FIELDS, POST_FIELDS, json_response, serialize_comment,
+    serialize_post,
+)
+from .views import comment_order
+
+MAX_PAGE_SIZE = 100
+
+conditional_get = decorator_from_middleware(ConditionalGetMiddleware)
+
+
+def api_view(scope=None):
+    """GET-only view с ETag и, если задан scope, кешем для анонимов."""
+    def decorator(view):
+        if scope is not None:
+            view = feed_cache.anonymous_page_cache(scope)(view)
+        return require_GET(conditional_get(view))
+    return decorator
+
+
+def not_found():
+    return json_response({'detail': 'Не найдено'}, status=404)
+
+
+def not_authenticated():
+    return json_response({'detail': 'Нужна авторизация'}, status=401)
+
+
+def forbidden():
+    return json_response({'detail': 'Доступ запрещён'}, status=403)
+
+
+def page_size(request, default=POSTS_PER_PAGE):
+    try:
+        size = int(request.GET.get('limit', default))
+    except ValueError:
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def page_response(request, paginator, serialize):
+    page = paginator.get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': [serialize(obj) for obj in page],
+        'next': page_link(request, page.next_cursor),
+        'previous': page_link(request, page.previous_cursor),
+    })
+
+
+def feed_response(request, post_list, ordering=FEED_ORDERING):
+    paginator = CursorPaginator(
+        post_list.only(*POST_FIELDS), page_size(request), ordering
+    )
+    return page_response(request, paginator, serialize_post)
+
+
+@api_view(feed_cache.index_scope)
+def posts(request):
+    return feed_response(request, Post.objects.for_feed())
+
+
+@api_view(feed_cache.group_scope)
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return not_found()
+    return feed_response(
+        request, Post.objects.for_feed().filter(group_id=group_id)
+    )
+
+
+@api_view(feed_cache.profile_scope)
+def profile_posts(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return not_found()
+    return feed_response(
+        request, Post.objects.for_feed().filter(author_id=author_id)
+    )
+
+
+@api_view()
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return not_authenticated()
+    return feed_response(
+        request, timeline.timeline_posts(request.user),
+        timeline.TIMELINE_ORDERING,
+    )
+
+
+def comment_paginator(post, order, per_page=COMMENTS_PER_PAGE):
+    return CursorPaginator(
+        post.comments.select_related('author').only(*COMMENT_FIELDS),
+        per_page,
+        COMMENT_ORDERINGS[order],
+    )
+
+
+@api_view(feed_cache.post_scope)
+def post_detail(request, post_id):
+    post = Post.objects.for_feed().only(*POST_FIELDS).filter(
+        pk=post_id
+    ).first()
+    if post is None:
+        return not_found()
+    order = comment_order(request)
+    comments, next_cursor = comment_paginator(post, order).first_page(
+        post.comments_count
+    )
+    comments_next = None
+    if next_cursor is not None:
+        comments_next = '{}?{}'.format(
+            reverse('api:post_comments', args=[post.pk]),
+            urlencode({'comments': order, 'cursor': next_cursor}),
+        )
+    return json_response({
+        **serialize_post(post),
+        'comments': [serialize_comment(comment) for comment in comments],
+        'comments_next': comments_next,
+    })
+
+
+@api_view(feed_cache.post_scope)
+def post_comments(request, post_id):
+    post = Post.objects.filter(pk=post_id).only('id').first()
+    if post is None:
+        return not_found()
+    paginator = comment_paginator(
+        post, comment_order(request), page_size(request, COMMENTS_PER_PAGE)
+    )
+    return page_response(request, paginator, serialize_comment)
+
+
+@require_POST
+def import_records(request):
+    """Импорт постов и комментариев из тела запроса в формате NDJSON.
+
+    Тело читается построчно из потока, не загружаясь в память целиком,
+    поэтому лимит DATA_UPLOAD_MAX_MEMORY_SIZE к нему не применяется.
+    """
+    if not request.user.is_authenticated:
+        return not_authenticated()
+    if not request.user.is_staff:
+        return forbidden()
+    stats = importer.import_ndjson(request)
+    return json_response(stats.as_dict())
+
+
+def export_response(request, posts, comments, name):
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in exporter.FORMATS:
+        return json_response(
+            {'detail': 'Формат: {}'.format(', '.join(exporter.FORMATS))},
+            status=400,
+        )
+    content_type, chunks = exporter.FORMATS[export_format]
+    response = StreamingHttpResponse(
+        chunks(posts, comments), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.{export_format}"'
+    )
+    return response
+
+
+@require_GET
+def user_export(request, username):
+    if not request.user.is_authenticated:
+        return not_authenticated()
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        return not_found()
+    if request.user != user and not request.user.is_staff:
+        return forbidden()
+    return export_response(
+        request, *exporter.user_export(user), user.username
+    )
+
+
+@require_GET
+def group_export(request, slug):
+    if not request.user.is_authenticated:
+        return not_authenticated()
+    if not request.user.is_staff:
+        return forbidden()
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return not_found()
+    return export_response(request, *exporter.group_export(group), slug)
@@ -0,0 +1,33 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.posts, name='posts'),
+    path('posts/<int:post_id>/', api.post_detail, name='post'),
+    path(
+        'posts/<int:post_id>/comments/',
+        api.post_comments,
+        name='post_comments'
+    ),
+    path('groups/<slug:slug>/posts/', api.group_posts, name='group_posts'),
+    path(
+        'groups/<slug:slug>/export/',
+        api.group_export,
+        name='group_export'
+    ),
+    path(
+        'users/<str:username>/posts/',
+        api.profile_posts,
+        name='profile_posts'
+    ),
+    path(
+        'users/<str:username>/export/',
+        api.user_export,
+        name='user_export'
+    ),
+    path('follow/', api.follow_posts, name='follow'),
+    path('import/', api.import_records, name='import'),
+]
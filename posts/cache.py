@@ -0,0 +1,258 @@
+"""Версионированные ключи для кеша лент и кеш страниц для анонимов.
+
+У каждой ленты есть поколение. Сигналы заменяют его новым при
+изменении постов, комментариев и групп, а фрагменты лент кешируются
+под ключом, включающим текущее поколение: после изменения шаблон
+просто перестаёт находить старые фрагменты, и они вытесняются по TTL.
+Рядом с поколением хранится время последнего изменения ленты, из него
+берётся Last-Modified.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+    quote_etag,
+)
+from django.utils.http import http_date
+
+from .constants import PAGE_CACHE_TIMEOUT
+from .models import Group, Post, User
+
+INDEX_FEED = 'index'
+GROUPS_FEED = 'groups'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def profile_feed(user_id):
+    return f'profile:{user_id}'
+
+
+def post_feed(post_id):
+    return f'post:{post_id}'
+
+
+def _version_key(feed):
+    return f'feed_version:{feed}'
+
+
+def _modified_key(feed):
+    return f'feed_modified:{feed}'
+
+
+def _fresh_version():
+    # Новое поколение не должно совпасть ни с одним из прежних, в том
+    # числе вытесненных из кеша, поэтому это отметка времени.
+    return time.time_ns()
+
+
+def feed_version(feed):
+    """Текущее поколение ленты."""
+    key = _version_key(feed)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def feed_versions(feeds):
+    """Поколения нескольких лент за одно обращение к кешу."""
+    keys = {_version_key(feed): feed for feed in feeds}
+    versions = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _fresh_version(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def post_card_keys(posts):
+    """Ключи закешированных карточек постов.
+
+    Поколение ленты поста меняется при правке, новых комментариях и
+    готовых миниатюрах, поколение GROUPS_FEED — при правке групп; имя
+    автора входит в ключ само, потому что его смена лент не трогает.
+    """
+    versions = feed_versions(
+        [GROUPS_FEED, *(post_feed(post.pk) for post in posts)]
+    )
+    return [
+        'post_card:{}:{}:{}:{}'.format(
+            post.pk, versions[post_feed(post.pk)], versions[GROUPS_FEED],
+            post.author.username,
+        )
+        for post in posts
+    ]
+
+
+def feeds_modified(feeds):
+    """Время последнего изменения лент в секундах.
+
+    Если отметка ленты вытеснена из кеша, изменением считается текущий
+    момент: лишний полный ответ лучше, чем 304 на устаревшую страницу.
+    """
+    keys = [_modified_key(feed) for feed in feeds]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, int(time.time()), timeout=None)
+            stamps[key] = cache.get(key, int(time.time()))
+    return max(stamps.values())
+
+
+def bump_feeds(*feeds):
+    """Сделать недействительными закешированные фрагменты лент."""
+    # Не incr: в файловом кеше и кеше в БД это чтение и запись, и из двух
+    # одновременных сдвигов один терялся бы. Новая отметка времени
+    # отличается от прежнего поколения при любом порядке записей.
+    cache.set_many(
+        {_version_key(feed): _fresh_version() for feed in feeds}, None
+    )
+    # Last-Modified точен до секунды; чтобы вторая правка за секунду
+    # тоже была видна по If-Modified-Since, отметка всегда растёт.
+    keys = [_modified_key(feed) for feed in feeds]
+    stamps = cache.get_many(keys)
+    now = int(time.time())
+    cache.set_many(
+        {key: max(now, stamps.get(key, 0) + 1) for key in keys}, None
+    )
+
+
+def bump_feeds_on_commit(*feeds):
+    """bump_feeds, который учитывает транзакцию пишущего.
+
+    Если поколение сдвинуть до COMMIT, конкурентный запрос успеет
+    прочитать старые данные и положить их в кеш под новым поколением,
+    где они проживут весь TTL. Поэтому внутри транзакции поколение
+    сдвигается ещё раз после фиксации. Сдвиг сразу оставлен, чтобы
+    изменения видел сам пишущий запрос (и тесты в TestCase, где
+    фиксации не бывает); вне транзакции on_commit выполняется сразу.
+    """
+    if transaction.get_connection().in_atomic_block:
+        bump_feeds(*feeds)
+    transaction.on_commit(lambda: bump_feeds(*feeds))
+
+
+def post_feeds(post):
+    """Ленты, в которых показывается пост."""
+    feeds = [INDEX_FEED, profile_feed(post.author_id), post_feed(post.pk)]
+    if post.group_id:
+        feeds.append(group_feed(post.group_id))
+    return feeds
+
+
+class PageScope:
+    """Ленты, от которых зависит страница.
+
+    По ним считаются валидаторы ответа: Last-Modified — самое позднее
+    изменение этих лент, ETag — оно же вместе с их поколениями
+    (поколения меняются и при нескольких правках за одну секунду).
+    Всё берётся из кеша, так что условный запрос не обращается к БД
+    дальше поиска группы или автора.
+    """
+
+    def __init__(self, feeds):
+        self.feeds = [GROUPS_FEED, *feeds]
+
+    def validators(self, request):
+        last_modified = feeds_modified(self.feeds)
+        versions = feed_versions(self.feeds)
+        digest = hashlib.md5('|'.join((
+            request.get_full_path(),
+            ':'.join(str(versions[feed]) for feed in self.feeds),
+            str(last_modified),
+        )).encode()).hexdigest()
+        return quote_etag(digest), last_modified
+
+
+def index_scope():
+    return PageScope([INDEX_FEED])
+
+
+def group_scope(slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return PageScope([group_feed(group_id)])
+
+
+def profile_scope(username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return PageScope([profile_feed(author_id)])
+
+
+def post_scope(post_id, username=None):
+    if username is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True
+        ).first()
+    else:
+        author_id = Post.objects.filter(
+            pk=post_id, author__username=username
+        ).values_list('author_id', flat=True).first()
+    if author_id is None:
+        return None
+    return PageScope([post_feed(post_id), profile_feed(author_id)])
+
+
+def anonymous_page_cache(scope):
+    """Кешировать страницу целиком для анонимных посетителей.
+
+    scope(**kwargs) получает аргументы view и возвращает PageScope или
+    None, если объекта нет (тогда отвечает сам view). Готовый HTML
+    хранится под ключом из ETag, запрос с совпадающим If-None-Match или
+    If-Modified-Since получает 304 без рендеринга шаблонов.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            page_scope = scope(**kwargs)
+            if page_scope is None:
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = page_scope.validators(request)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                key = f'anonymous_page:{etag}'
+                cached = cache.get(key)
+                if cached is not None:
+                    content, content_type = cached
+                    response = HttpResponse(content, content_type=content_type)
+                else:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    cache.set(
+                        key,
+                        (response.content, response['Content-Type']),
+                        PAGE_CACHE_TIMEOUT,
+                    )
+
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
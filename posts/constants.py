@@ -1 +1,4 @@
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+PAGE_CACHE_TIMEOUT = 60 * 60
+POST_CARD_TIMEOUT = 24 * 60 * 60
@@ -0,0 +1,88 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарными UPDATE ... SET x = x + 1 из обработчиков
+сигналов, поэтому карточки профиля и поста читают их без COUNT(*).
+Записи, созданные в обход сигналов (bulk_create, raw SQL), приводятся
+в порядок командой ``manage.py recount``.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+def _count(queryset, field):
+    """Подзапрос с числом строк queryset, у которых field == pk снаружи."""
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _bump(queryset, **deltas):
+    return queryset.update(**{
+        name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()
+    })
+
+
+def bump_author(user_id, **deltas):
+    # Отсутствующую запись не создаём: её пересчитает author_stats()
+    # при первом чтении, а при каскадном удалении пользователя она не нужна.
+    _bump(AuthorStats.objects.filter(user_id=user_id), **deltas)
+
+
+def bump_comments(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+def follow_changed(user_id, author_id, delta):
+    with transaction.atomic():
+        bump_author(user_id, following_count=delta)
+        bump_author(author_id, followers_count=delta)
+
+
+def author_stats(user):
+    """Счётчики пользователя; отсутствующая запись пересчитывается."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        recount_authors(User.objects.filter(pk=user.pk))
+        return AuthorStats.objects.get(user=user)
+
+
+def recount_posts(posts=None):
+    if posts is None:
+        posts = Post.objects.all()
+    return posts.update(comments_count=_count(Comment.objects, 'post'))
+
+
+def recount_authors(users=None):
+    if users is None:
+        users = User.objects.all()
+    with transaction.atomic():
+        AuthorStats.objects.bulk_create(
+            (
+                AuthorStats(user_id=user_id)
+                for user_id in users.filter(
+                    stats__isnull=True
+                ).values_list('pk', flat=True)
+            ),
+            ignore_conflicts=True,
+        )
+        return AuthorStats.objects.filter(user__in=users).update(
+            posts_count=_count(Post.objects, 'author'),
+            followers_count=_count(Follow.objects, 'author'),
+            following_count=_count(Follow.objects, 'user'),
+        )
@@ -0,0 +1,180 @@
+"""Потоковая выгрузка постов и комментариев пользователя или группы.
+
+Записи выгружаются в том же виде, в каком их принимает импорт
+(posts/importer.py): сначала посты, затем комментарии, по возрастанию
+ключа. Строки читаются из БД через iterator(chunk_size) без создания
+объектов моделей и склеиваются в куски по STREAM_BUFFER_SIZE байт,
+поэтому расход памяти не зависит от числа постов.
+
+Архив zip собирается на лету: zipfile пишет в буфер, который
+опустошается после каждой записи, а изображения копируются из
+хранилища кусками. Без seek zipfile дописывает размеры файлов после
+их содержимого, так что архив не нужно держать целиком.
+"""
+import csv
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import Comment, Post
+from .serializers import dumps
+
+CHUNK_SIZE = 2000
+STREAM_BUFFER_SIZE = 64 * 1024
+CSV_COLUMNS = (
+    'type', 'id', 'post', 'author', 'group', 'text', 'pub_date', 'created',
+    'image',
+)
+ARCHIVE_RECORDS = 'posts.ndjson'
+ARCHIVE_MEDIA = 'media'
+
+
+def user_export(user):
+    """Посты пользователя и все его комментарии."""
+    return (
+        Post.objects.filter(author=user),
+        Comment.objects.filter(author=user),
+    )
+
+
+def group_export(group):
+    """Посты группы и все комментарии к ним."""
+    return (
+        Post.objects.filter(group=group),
+        Comment.objects.filter(post__group=group),
+    )
+
+
+def records(posts, comments):
+    rows = posts.order_by('pk').values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date', 'image'
+    )
+    for pk, author, group, text, pub_date, image in rows.iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        yield {
+            'type': 'post',
+            'id': pk,
+            'author': author,
+            'group': group,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'image': image or None,
+        }
+    rows = comments.order_by('pk').values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created'
+    )
+    for pk, post_id, author, text, created in rows.iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        yield {
+            'type': 'comment',
+            'id': pk,
+            'post': post_id,
+            'author': author,
+            'text': text,
+            'created': created.isoformat(),
+        }
+
+
+def _buffered(chunks):
+    """Склеить мелкие куски, чтобы не отдавать по строке за раз."""
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def ndjson_chunks(posts, comments):
+    return _buffered(
+        dumps(record) + b'\n' for record in records(posts, comments)
+    )
+
+
+class _Echo:
+    """Файл для csv.writer, который просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_rows(records):
+    yield CSV_COLUMNS
+    for record in records:
+        yield [record.get(column) for column in CSV_COLUMNS]
+
+
+def csv_chunks(posts, comments):
+    writer = csv.writer(_Echo())
+    return _buffered(
+        writer.writerow(row).encode()
+        for row in _csv_rows(records(posts, comments))
+    )
+
+
+class _ZipStream:
+    """Поток без seek для zipfile: копит байты до следующей отдачи."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_chunks(posts, comments, storage=default_storage):
+    """Архив с записями в NDJSON и исходными изображениями постов."""
+    return (
+        chunk for chunk in _zip_chunks(posts, comments, storage) if chunk
+    )
+
+
+def _zip_chunks(posts, comments, storage):
+    stream = _ZipStream()
+    date_time = timezone.now().timetuple()[:6]
+    with zipfile.ZipFile(stream, 'w') as archive:
+        info = zipfile.ZipInfo(ARCHIVE_RECORDS, date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, 'w', force_zip64=True) as target:
+            for chunk in ndjson_chunks(posts, comments):
+                target.write(chunk)
+                yield stream.pop()
+
+        images = posts.exclude(image='').exclude(image=None).order_by(
+            'pk'
+        ).values_list('image', flat=True)
+        for name in images.iterator(chunk_size=CHUNK_SIZE):
+            if not storage.exists(name):
+                continue
+            # Изображения уже сжаты, повторно их не сжимаем.
+            info = zipfile.ZipInfo(f'{ARCHIVE_MEDIA}/{name}', date_time)
+            with storage.open(name) as source:
+                with archive.open(info, 'w', force_zip64=True) as target:
+                    for chunk in source.chunks():
+                        target.write(chunk)
+                        yield stream.pop()
+    yield stream.pop()
+
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_chunks),
+    'csv': ('text/csv; charset=utf-8', csv_chunks),
+    'zip': ('application/zip', zip_chunks),
+}
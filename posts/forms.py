@@ -1,5 +1,7 @@
 from django import forms
+from django.conf import settings
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -8,6 +10,27 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('group', 'text', 'image',)
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean_image(self):
+        if 'image' in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors['image'])
+        image = self.cleaned_data.get('image')
+        if not getattr(image, 'image', None):
+            return image
+        # Размеры известны из заголовка: ImageField только проверил файл,
+        # но ещё не декодировал пиксели.
+        width, height = image.image.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                'Изображение слишком большое: {}×{} точек.'.format(
+                    width, height
+                )
+            )
+        return uploads.sanitize_image(image)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,299 @@
+"""Импорт постов и комментариев из NDJSON.
+
+Каждая строка потока — JSON-объект одной записи::
+
+    {"type": "post", "id": 10, "author": "leo", "group": "cats",
+     "text": "...", "pub_date": "2019-05-01T10:00:00+03:00"}
+    {"type": "comment", "id": 7, "post": 10, "author": "leo",
+     "text": "...", "created": "2019-05-02T08:00:00+03:00"}
+
+id необязателен. Если он задан, запись получает этот первичный ключ,
+а записи с уже занятым ключом пропускаются, поэтому прерванный импорт
+можно запустить заново. Авторы и группы ищутся по username и slug и
+должны существовать; комментарий ссылается на пост по первичному ключу.
+
+Строки читаются порциями по chunk_size, каждая порция вставляется в
+своей транзакции в обход сигналов и auto_now_add: даты берутся из
+записей. В той же транзакции для затронутых постов и авторов
+пересчитываются счётчики, ленты подписок и поисковый индекс, так что
+после каждой порции база согласована.
+"""
+import time
+from itertools import islice
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache, counters, search, timeline
+from .models import Comment, Group, Post
+from .serializers import loads
+
+User = get_user_model()
+
+CHUNK_SIZE = 1000
+# Сколько сообщений об ошибках хранить; остальные только считаются.
+MAX_REPORTED_ERRORS = 100
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+class ImportStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.lines = 0
+        self.posts = 0
+        self.comments = 0
+        self.skipped = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'строка {line}: {message}')
+
+    def rate(self):
+        """Обработанных строк в секунду."""
+        return self.lines / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'lines': self.lines,
+            'posts': self.posts,
+            'comments': self.comments,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+            'rate': round(self.rate(), 1),
+        }
+
+
+def _text(record, field):
+    value = record.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise InvalidRecord(f'нет поля {field}')
+    return value
+
+
+def _date(record, field):
+    value = record.get(field)
+    if value is None:
+        return timezone.now()
+    try:
+        # parse_datetime отвечает ValueError на несуществующие даты
+        # вроде 2019-13-01, make_aware — на пропущенное при переводе
+        # часов время.
+        date = parse_datetime(value) if isinstance(value, str) else None
+        if date is not None and timezone.is_naive(date):
+            date = timezone.make_aware(date)
+    except (ValueError, OverflowError, pytz.InvalidTimeError):
+        date = None
+    if date is None:
+        raise InvalidRecord(f'неверная дата в поле {field}')
+    return date
+
+
+def _pk(record, field, required=False):
+    value = record.get(field)
+    if value is None and not required:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise InvalidRecord(f'неверный ключ в поле {field}')
+    return value
+
+
+def _lookup(queryset, field, values):
+    return dict(
+        queryset.filter(**{f'{field}__in': values}).values_list(field, 'pk')
+    )
+
+
+def _insert(model, objs):
+    """Вставить объекты одним подготовленным INSERT на порцию.
+
+    bulk_create вызывает pre_save полей, и auto_now_add заменил бы даты
+    из записей текущим временем; кроме того, компиляция запроса через
+    ORM на каждую строку дороже самой вставки. Здесь значения берутся
+    из объектов как есть и передаются в executemany. Объекты с заданным
+    ключом вставляются отдельно, занятые ключи пропускаются. Возвращает
+    число действительно вставленных строк.
+    """
+    ops = connection.ops
+    table = ops.quote_name(model._meta.db_table)
+    fields = model._meta.concrete_fields
+    with_pk = [obj for obj in objs if obj.pk is not None]
+    without_pk = [obj for obj in objs if obj.pk is None]
+    # rowcount после executemany не везде складывается по строкам,
+    # поэтому занятые ключи считаются заранее.
+    inserted = len(without_pk)
+    if with_pk:
+        keys = {obj.pk for obj in with_pk}
+        inserted += len(keys) - model.objects.filter(pk__in=keys).count()
+    with connection.cursor() as cursor:
+        for batch, batch_fields, ignore_conflicts in (
+            (with_pk, fields, True),
+            (without_pk,
+             [field for field in fields if not field.primary_key], False),
+        ):
+            if not batch:
+                continue
+            cursor.executemany(
+                '{} {} ({}) VALUES ({}) {}'.format(
+                    ops.insert_statement(ignore_conflicts=ignore_conflicts),
+                    table,
+                    ', '.join(
+                        ops.quote_name(field.column) for field in batch_fields
+                    ),
+                    ', '.join(['%s'] * len(batch_fields)),
+                    ops.ignore_conflicts_suffix_sql(
+                        ignore_conflicts=ignore_conflicts
+                    ),
+                ),
+                [
+                    [
+                        field.get_db_prep_save(
+                            getattr(obj, field.attname), connection
+                        )
+                        for field in batch_fields
+                    ]
+                    for obj in batch
+                ],
+            )
+        if with_pk:
+            # В PostgreSQL последовательность ключей не знает о вставленных
+            # вручную значениях; в SQLite список команд пуст.
+            for sql in ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
+    return inserted
+
+
+def _parse(chunk, stats):
+    records = []
+    for line, raw in chunk:
+        try:
+            record = loads(raw)
+            if not isinstance(record, dict):
+                raise InvalidRecord('ожидается объект')
+            if record.get('type') not in ('post', 'comment'):
+                raise InvalidRecord('type должен быть post или comment')
+            _text(record, 'author')
+            if not isinstance(record.get('group'), (str, type(None))):
+                raise InvalidRecord('group должен быть строкой')
+            records.append((line, record))
+        except InvalidRecord as error:
+            stats.error(line, error)
+        except ValueError:
+            stats.error(line, 'неверный JSON')
+    return records
+
+
+def _import_chunk(chunk, stats):
+    records = _parse(chunk, stats)
+    authors = _lookup(
+        User.objects, 'username', {record['author'] for _, record in records}
+    )
+    groups = _lookup(Group.objects, 'slug', {
+        record['group'] for _, record in records
+        if record['type'] == 'post' and record.get('group')
+    })
+
+    posts = []
+    comments = []
+    for line, record in records:
+        try:
+            author_id = authors.get(record['author'])
+            if author_id is None:
+                raise InvalidRecord(f'нет автора {record["author"]}')
+            if record['type'] == 'post':
+                group = record.get('group')
+                group_id = groups.get(group) if group else None
+                if group and group_id is None:
+                    raise InvalidRecord(f'нет группы {group}')
+                posts.append(Post(
+                    pk=_pk(record, 'id'),
+                    text=_text(record, 'text'),
+                    pub_date=_date(record, 'pub_date'),
+                    author_id=author_id,
+                    group_id=group_id,
+                ))
+            else:
+                comments.append((line, Comment(
+                    pk=_pk(record, 'id'),
+                    post_id=_pk(record, 'post', required=True),
+                    text=_text(record, 'text'),
+                    created=_date(record, 'created'),
+                    author_id=author_id,
+                )))
+        except InvalidRecord as error:
+            stats.error(line, error)
+
+    with transaction.atomic():
+        last_post = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        inserted_posts = _insert(Post, posts)
+        post_ids = set(
+            Post.objects.filter(pk__gt=last_post).values_list('pk', flat=True)
+        )
+        post_ids.update(post.pk for post in posts if post.pk is not None)
+
+        existing = set(Post.objects.filter(
+            pk__in={comment.post_id for _, comment in comments}
+        ).values_list('pk', flat=True))
+        for line, comment in comments:
+            if comment.post_id not in existing:
+                stats.error(line, f'нет поста {comment.post_id}')
+        comments = [
+            comment for _, comment in comments
+            if comment.post_id in existing
+        ]
+        inserted_comments = _insert(Comment, comments)
+
+        _refresh(post_ids, {comment.post_id for comment in comments})
+    stats.posts += inserted_posts
+    stats.comments += inserted_comments
+
+
+def _refresh(post_ids, commented_ids):
+    """Привести в порядок всё, что обычно обновляют сигналы."""
+    new_posts = Post.objects.filter(pk__in=post_ids)
+    author_ids = set(new_posts.values_list('author_id', flat=True))
+    group_ids = set(
+        new_posts.exclude(group=None).values_list('group_id', flat=True)
+    )
+
+    counters.recount_posts(Post.objects.filter(pk__in=commented_ids))
+    counters.recount_authors(User.objects.filter(pk__in=author_ids))
+    timeline.fan_out_posts(post_ids)
+    search.index_posts(post_ids)
+    cache.bump_feeds_on_commit(
+        cache.INDEX_FEED,
+        *(cache.group_feed(group_id) for group_id in group_ids),
+        *(cache.profile_feed(author_id) for author_id in author_ids),
+        # Страниц новых постов ещё нет в кеше.
+        *(cache.post_feed(pk) for pk in commented_ids - post_ids),
+    )
+
+
+def import_ndjson(lines, chunk_size=CHUNK_SIZE):
+    """Импортировать строки NDJSON (str или bytes), вернуть ImportStats."""
+    stats = ImportStats()
+    numbered = (
+        (number, line)
+        for number, line in enumerate(lines, start=1)
+        if line.strip()
+    )
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            break
+        stats.lines = chunk[-1][0]
+        _import_chunk(chunk, stats)
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок (TimelineEntry)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пользователи, ленты которых нужно пересобрать. '
+                 'По умолчанию пересобираются все ленты.',
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = get_user_model().objects.filter(
+                username__in=options['usernames']
+            )
+        created = timeline.rebuild(users)
+        self.stdout.write(
+            self.style.SUCCESS(f'Записей в лентах: {created}')
+        )
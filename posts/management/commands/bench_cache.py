@@ -0,0 +1,100 @@
+import itertools
+import multiprocessing
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def run_worker(worker, options):
+    """Один «процесс gunicorn»: читает ключи по закону Ципфа и
+    пересчитывает значение при промахе."""
+    connections.close_all()
+    cache = caches[options['alias']]
+    rng = random.Random(options['seed'] + worker)
+    weights = list(itertools.accumulate(
+        1 / rank ** options['skew'] for rank in range(1, options['keys'] + 1)
+    ))
+    payload = 'x' * options['value_size']
+    hits = misses = 0
+    started = time.perf_counter()
+    for _ in range(options['requests']):
+        key = 'bench:{}'.format(
+            rng.choices(range(options['keys']), cum_weights=weights)[0]
+        )
+        if rng.random() < options['invalidate']:
+            cache.delete(key)
+        if cache.get(key) is None:
+            misses += 1
+            cache.set(key, payload, options['timeout'])
+        else:
+            hits += 1
+    elapsed = time.perf_counter() - started
+    return worker, hits, misses, elapsed, dict(getattr(cache, 'stats', {}))
+
+
+class Command(BaseCommand):
+    help = ('Измеряет долю попаданий в кеш при нескольких процессах, '
+            'читающих общий набор ключей')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--keys', type=int, default=250)
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--invalidate', type=float, default=0.001)
+        parser.add_argument('--value-size', type=int, default=2048)
+        parser.add_argument('--timeout', type=int, default=300)
+        parser.add_argument('--alias', default='default')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def describe(self, cache_settings):
+        # MeteredCache только считает обращения, интересен обёрнутый кеш.
+        options = cache_settings.get('OPTIONS', {})
+        if 'CACHE' in options:
+            return self.describe(options['CACHE'])
+        description = '{} {}'.format(
+            cache_settings['BACKEND'], cache_settings.get('LOCATION', '')
+        ).strip()
+        if 'SHARED' in options:
+            description += ' поверх {}'.format(
+                self.describe(settings.CACHES[options['SHARED']])
+            )
+        return description
+
+    def handle(self, *args, **options):
+        self.stdout.write('Кеш: {}'.format(
+            self.describe(settings.CACHES[options['alias']])
+        ))
+        caches[options['alias']].clear()
+        connections.close_all()
+
+        # Каждый процесс получает собственную память, как воркер gunicorn.
+        context = multiprocessing.get_context('fork')
+        with context.Pool(options['workers']) as pool:
+            results = pool.starmap(
+                run_worker,
+                [(worker, options) for worker in range(options['workers'])],
+            )
+
+        total_hits = total_misses = 0
+        for worker, hits, misses, elapsed, stats in sorted(results):
+            total_hits += hits
+            total_misses += misses
+            line = 'воркер {}: попаданий {:.1%}, {:.0f} запросов/с'.format(
+                worker, hits / (hits + misses), (hits + misses) / elapsed
+            )
+            if stats:
+                line += ', ' + ', '.join(
+                    f'{name}={value}' for name, value in sorted(stats.items())
+                )
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            'Всего: попаданий {:.1%} из {} запросов'.format(
+                total_hits / (total_hits + total_misses),
+                total_hits + total_misses,
+            )
+        ))
@@ -0,0 +1,154 @@
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.urls import resolve, reverse
+
+from posts.models import AuthorStats, Group, Post, User
+
+# Доля запросов к каждой странице: ленты и посты читают чаще всего.
+MIX = (
+    ('index', 30),
+    ('group', 15),
+    ('profile', 20),
+    ('post', 25),
+    ('follow_index', 5),
+    ('search', 5),
+)
+SEARCH_WORDS = ('новости', 'фото', 'рецепты', 'книги', 'музыка')
+
+
+def percentile(values, fraction):
+    """Перцентиль методом ближайшего ранга по отсортированному списку."""
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+class Targets:
+    """Адреса для нагрузки, популярные авторы и посты выбираются чаще."""
+
+    def __init__(self, sample):
+        authors = AuthorStats.objects.order_by('-followers_count')
+        self.usernames = list(
+            authors.values_list('user__username', flat=True)[:sample]
+        )
+        self.posts = list(
+            Post.objects.order_by('-comments_count')
+            .values_list('author__username', 'pk')[:sample]
+        )
+        self.groups = list(Group.objects.values_list('slug', flat=True))
+        self.pages = [name for name, _ in MIX]
+        self.weights = [weight for _, weight in MIX]
+
+    @staticmethod
+    def popular(rng, items):
+        return items[int(len(items) ** rng.random()) - 1]
+
+    def url(self, rng, signed_in):
+        while True:
+            page = rng.choices(self.pages, self.weights)[0]
+            if page == 'index':
+                return reverse('index'), {'page': rng.randint(1, 3)}
+            if page == 'group' and self.groups:
+                return reverse('group', args=[rng.choice(self.groups)]), {}
+            if page == 'profile' and self.usernames:
+                username = self.popular(rng, self.usernames)
+                return reverse('profile', args=[username]), {}
+            if page == 'post' and self.posts:
+                username, post_id = self.popular(rng, self.posts)
+                return reverse('post', args=[username, post_id]), {}
+            if page == 'follow_index' and signed_in:
+                return reverse('follow_index'), {}
+            if page == 'search':
+                return reverse('search'), {'q': rng.choice(SEARCH_WORDS)}
+
+
+def run_worker(worker, targets, user, options):
+    """Один поток: свой клиент, свой генератор и своё соединение с БД."""
+    rng = random.Random(options['seed'] + worker)
+    client = Client(SERVER_NAME='localhost')
+    if user is not None:
+        client.force_login(user)
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    try:
+        for _ in range(options['requests']):
+            path, params = targets.url(rng, user is not None)
+            name = resolve(path).url_name
+            started = time.perf_counter()
+            response = client.get(path, params)
+            timings[name].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[name] += 1
+    finally:
+        connections.close_all()
+    return timings, errors
+
+
+class Command(BaseCommand):
+    help = ('Нагружает сайт из нескольких потоков тестовым клиентом Django '
+            'и выводит перцентили времени ответа по страницам. Потоки делят '
+            'GIL, поэтому цифры показывают относительную стоимость страниц, '
+            'а не пропускную способность сервера')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на поток')
+        parser.add_argument('--signed-in', type=float, default=0.25,
+                            help='Доля потоков с авторизованным клиентом')
+        parser.add_argument('--sample', type=int, default=1000,
+                            help='Сколько популярных авторов и постов брать')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        targets = Targets(options['sample'])
+        signed_in = round(options['threads'] * options['signed_in'])
+        users = list(
+            User.objects.filter(
+                username__in=targets.usernames
+            ).order_by('?')[:signed_in]
+        )
+        users += [None] * (options['threads'] - len(users))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as executor:
+            futures = [
+                executor.submit(run_worker, worker, targets, user, options)
+                for worker, user in enumerate(users)
+            ]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        timings = defaultdict(list)
+        errors = defaultdict(int)
+        for worker_timings, worker_errors in results:
+            for name, values in worker_timings.items():
+                timings[name].extend(values)
+            for name, count in worker_errors.items():
+                errors[name] += count
+
+        self.stdout.write('{:<14} {:>7} {:>8} {:>8} {:>8} {:>7}'.format(
+            'страница', 'запросы', 'p50, мс', 'p95, мс', 'p99, мс', 'ошибки'
+        ))
+        total = 0
+        for name in sorted(timings):
+            values = sorted(timings[name])
+            total += len(values)
+            self.stdout.write(
+                '{:<14} {:>7} {:>8.1f} {:>8.1f} {:>8.1f} {:>7}'.format(
+                    name, len(values),
+                    *(percentile(values, fraction) * 1000
+                      for fraction in (0.5, 0.95, 0.99)),
+                    errors[name],
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Всего {} запросов за {:.1f} с, {:.0f} запросов/с'.format(
+                total, elapsed, total / elapsed
+            )
+        ))
@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Engine, engines
+
+from posts.models import Post
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+PAGES = {
+    'include': (
+        '{% for post in posts %}'
+        '{% include "includes/post_item.html" with post=post %}'
+        '{% endfor %}'
+    ),
+    'post_cards': '{% load post_cards %}{% post_cards posts %}',
+}
+
+
+def plain_loaders(loaders):
+    """Загрузчики из настроек без обёртки cached.Loader."""
+    result = []
+    for loader in loaders:
+        if isinstance(loader, (list, tuple)) and loader[0] == CACHED_LOADER:
+            result.extend(loader[1])
+        else:
+            result.append(loader)
+    return result
+
+
+def build_engine(base, cached):
+    loaders = plain_loaders(base.loaders)
+    if cached:
+        loaders = [(CACHED_LOADER, loaders)]
+    return Engine(
+        dirs=base.dirs, loaders=loaders, libraries=base.libraries,
+        builtins=base.builtins, debug=base.debug,
+    )
+
+
+class Command(BaseCommand):
+    help = ('Измеряет время отрисовки одной карточки поста в ленте '
+            'с кешем шаблонов и без него')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        posts = list(Post.objects.for_feed()[:options['posts']])
+        if not posts:
+            raise CommandError('Нет постов: запустите seed_load')
+        base = engines.all()[0].engine
+        self.stdout.write('Постов на странице: {}, повторов: {}'.format(
+            len(posts), options['repeat']
+        ))
+        for cached in (False, True):
+            engine = build_engine(base, cached)
+            for name, source in PAGES.items():
+                page = engine.from_string(source)
+                context = {'posts': posts, 'user': AnonymousUser()}
+                page.render(Context(context))
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    page.render(Context(context))
+                elapsed = time.perf_counter() - started
+                per_card = elapsed / options['repeat'] / len(posts) * 1e6
+                self.stdout.write('{:<6} {:<10} {:8.1f} мкс на карточку'
+                                  .format('cached' if cached else 'plain',
+                                          name, per_card))
@@ -0,0 +1,93 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from .bench_load import percentile
+
+
+def run_writer(user, urls, options):
+    """Один поток: свой клиент и своё соединение с БД."""
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(user)
+    timings = []
+    errors = Counter()
+    try:
+        for number in range(options['requests']):
+            url = urls[number % len(urls)]
+            started = time.perf_counter()
+            try:
+                response = client.post(url, {'text': f'Комментарий {number}'})
+            except Exception as error:
+                errors[type(error).__name__] += 1
+                continue
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                errors[str(response.status_code)] += 1
+    finally:
+        connections.close_all()
+    return timings, errors
+
+
+class Command(BaseCommand):
+    help = ('Добавляет комментарии из нескольких потоков одновременно и '
+            'выводит перцентили времени ответа и ошибки. Все потоки пишут '
+            'в несколько самых обсуждаемых постов, поэтому спорят за '
+            'одни и те же строки счётчиков')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Комментариев на поток')
+        parser.add_argument('--posts', type=int, default=5,
+                            help='Сколько постов комментировать')
+
+    def handle(self, *args, **options):
+        urls = [
+            reverse('add_comment', args=[username, post_id])
+            for username, post_id in Post.objects.order_by(
+                '-comments_count'
+            ).values_list('author__username', 'pk')[:options['posts']]
+        ]
+        users = list(User.objects.order_by('pk')[:options['threads']])
+        if not urls or len(users) < options['threads']:
+            raise CommandError('Сначала наполните базу: manage.py seed_load')
+        connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as executor:
+            futures = [
+                executor.submit(run_writer, user, urls, options)
+                for user in users
+            ]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(
+            value for worker_timings, _ in results for value in worker_timings
+        )
+        errors = sum((worker_errors for _, worker_errors in results),
+                     Counter())
+        self.stdout.write('База: {}, потоков: {}'.format(
+            connections['default'].settings_dict['ENGINE'],
+            options['threads'],
+        ))
+        if timings:
+            self.stdout.write('p50 {:.1f} мс, p95 {:.1f} мс, p99 {:.1f} мс'
+                              .format(*(percentile(timings, fraction) * 1000
+                                        for fraction in (0.5, 0.95, 0.99))))
+        self.stdout.write('Ошибки: {}'.format(
+            ', '.join(f'{name} {count}' for name, count in errors.items())
+            or 'нет'
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            'Всего {} комментариев за {:.1f} с, {:.0f} в секунду'.format(
+                len(timings), elapsed, len(timings) / elapsed
+            )
+        ))
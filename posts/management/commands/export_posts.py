@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты и комментарии пользователя или группы в файл '
+            '(или в стандартный вывод, если вместо пути указан «-») в '
+            'формате NDJSON, CSV или zip-архивом с изображениями')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--user', help='Имя пользователя')
+        source.add_argument('--group', help='Адрес группы')
+        parser.add_argument('--format', choices=list(exporter.FORMATS),
+                            default='ndjson')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+            posts, comments = exporter.user_export(user)
+        else:
+            group = Group.objects.filter(slug=options['group']).first()
+            if group is None:
+                raise CommandError(f'Нет группы {options["group"]}')
+            posts, comments = exporter.group_export(group)
+
+        _, chunks = exporter.FORMATS[options['format']]
+        if options['path'] == '-':
+            for chunk in chunks(posts, comments):
+                sys.stdout.buffer.write(chunk)
+        else:
+            with open(options['path'], 'wb') as output:
+                for chunk in chunks(posts, comments):
+                    output.write(chunk)
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты и комментарии из файла NDJSON (или из '
+            'стандартного ввода, если вместо пути указан «-»). Записи '
+            'вставляются порциями в отдельных транзакциях с исходными '
+            'датами, после каждой порции обновляются счётчики, ленты '
+            'подписок и поисковый индекс')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int,
+                            default=importer.CHUNK_SIZE,
+                            help='Строк в одной транзакции')
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            stats = importer.import_ndjson(
+                sys.stdin.buffer, options['chunk_size']
+            )
+        else:
+            with open(options['path'], 'rb') as lines:
+                stats = importer.import_ndjson(lines, options['chunk_size'])
+
+        for error in stats.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            'Импортировано постов: {}, комментариев: {}, пропущено строк: '
+            '{} за {:.1f} с, {:.0f} строк/с'.format(
+                stats.posts, stats.comments, stats.skipped,
+                stats.elapsed, stats.rate(),
+            )
+        ))
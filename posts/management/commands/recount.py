@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счётчики комментариев, '
+            'постов и подписок')
+
+    def handle(self, *args, **options):
+        posts = counters.recount_posts()
+        authors = counters.recount_authors()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {posts}, авторов: {authors}'
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import seed
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками для нагрузочных тестов. '
+            'Авторы и посты выбираются по степенному закону: немногие '
+            'собирают большую часть постов, подписчиков и комментариев')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = seed.seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            random_seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Создано за {:.1f} с: {}'.format(
+                time.perf_counter() - started,
+                ', '.join(f'{name} {count}'
+                          for name, count in created.items()),
+            )
+        ))
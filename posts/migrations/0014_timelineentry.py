@@ -0,0 +1,74 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timeline(apps, schema_editor):
+    # Лента /follow/ сразу читается из TimelineEntry, поэтому записи для
+    # уже существующих подписок раскладываются здесь же — тем же
+    # INSERT ... SELECT, что и в posts.timeline, но по историческим
+    # моделям.
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    ops = schema_editor.connection.ops
+    quote = ops.quote_name
+
+    def column(model, name):
+        return quote(model._meta.get_field(name).column)
+
+    schema_editor.execute(
+        '{insert} {entries} ({user}, {post}, {pub_date}) '
+        'SELECT follow.{follower}, post.{post_id}, post.{post_date} '
+        'FROM {follows} follow '
+        'INNER JOIN {posts} post ON post.{author} = follow.{followed} '
+        '{suffix}'.format(
+            insert=ops.insert_statement(ignore_conflicts=True),
+            entries=quote(TimelineEntry._meta.db_table),
+            user=column(TimelineEntry, 'user'),
+            post=column(TimelineEntry, 'post'),
+            pub_date=column(TimelineEntry, 'pub_date'),
+            follower=column(Follow, 'user'),
+            post_id=column(Post, 'id'),
+            post_date=column(Post, 'pub_date'),
+            follows=quote(Follow._meta.db_table),
+            posts=quote(Post._meta.db_table),
+            author=column(Post, 'author'),
+            followed=column(Follow, 'author'),
+            suffix=ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_auto_20210131_0122'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'ordering': ('-pub_date',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
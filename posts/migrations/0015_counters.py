@@ -0,0 +1,65 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+
+    Post.objects.update(
+        comments_count=count_subquery(Comment.objects, 'post')
+    )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=user_id)
+        for user_id in User.objects.values_list('pk', flat=True).iterator()
+    )
+    AuthorStats.objects.update(
+        posts_count=count_subquery(Post.objects, 'author'),
+        followers_count=count_subquery(Follow.objects, 'author'),
+        following_count=count_subquery(Follow.objects, 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0014_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
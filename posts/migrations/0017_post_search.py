@@ -0,0 +1,85 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:02
+
+from django.conf import settings
+from django.db import migrations
+import django.db.models.deletion
+import posts.models
+
+SQLITE_TABLE = '''
+    CREATE VIRTUAL TABLE posts_post_search USING fts5(
+        text, group_text, author,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+'''
+
+POSTGRESQL_TABLE = '''
+    CREATE TABLE posts_post_search (
+        rowid integer PRIMARY KEY
+            REFERENCES posts_post (id) ON DELETE CASCADE
+            DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    );
+    CREATE INDEX posts_post_search_document_idx
+        ON posts_post_search USING gin (document)
+'''
+
+SQLITE_FILL = '''
+    INSERT INTO posts_post_search (rowid, text, group_text, author)
+    SELECT p.id, p.text,
+           COALESCE(g.title || ' ' || g.description, ''), u.username
+    FROM posts_post p
+    INNER JOIN {users} u ON u.id = p.author_id
+    LEFT OUTER JOIN posts_group g ON g.id = p.group_id
+'''
+
+POSTGRESQL_FILL = '''
+    INSERT INTO posts_post_search (rowid, document)
+    SELECT p.id,
+           setweight(to_tsvector('russian', p.text), 'B') ||
+           setweight(to_tsvector('russian',
+               COALESCE(g.title || ' ' || g.description, '')), 'C') ||
+           setweight(to_tsvector('simple', u.username), 'A')
+    FROM posts_post p
+    INNER JOIN {users} u ON u.id = p.author_id
+    LEFT OUTER JOIN posts_group g ON g.id = p.group_id
+'''
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        return
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    table, fill = (
+        (SQLITE_TABLE, SQLITE_FILL) if vendor == 'sqlite'
+        else (POSTGRESQL_TABLE, POSTGRESQL_FILL)
+    )
+    schema_editor.execute(table)
+    schema_editor.execute(fill.format(users=User._meta.db_table))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', posts.models.PostSearchKey(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='posts.Post')),
+            ],
+            options={
+                'db_table': 'posts_post_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
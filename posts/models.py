@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import NotSupportedError, models
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+SEARCH_CONFIG = 'russian'
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -26,6 +28,16 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты вместе с автором и группой одним запросом.
+
+        Число комментариев хранится в самом посте (comments_count),
+        поэтому страница ленты не зависит от числа постов на ней.
+        """
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -59,13 +71,46 @@ class Post(models.Model):
         verbose_name='Изображение',
         help_text='Загрузите изображение',
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев',
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Счётчик меняют только запросы UPDATE из counters.py. Обычное
+        # сохранение записало бы значение, прочитанное вместе с постом,
+        # и стёрло бы комментарии, добавленные с тех пор.
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -89,6 +134,15 @@ class Comment(models.Model):
         verbose_name='Дата публикации',
     )
 
+    class Meta:
+        ordering = ('created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -111,3 +165,132 @@ class Follow(models.Model):
                 name='unique_follow',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            )
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок',
+    )
+
+
+class SearchMatch(models.Lookup):
+    """Условие полнотекстового поиска: ``search_entry__match=запрос``.
+
+    Запрос передаётся как есть, разбор на слова зависит от СУБД: в
+    SQLite слова экранируются для FTS5, в PostgreSQL запрос разбирает
+    plainto_tsquery.
+    """
+    lookup_name = 'match'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [value]
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError(
+            f'Полнотекстовый поиск не поддерживается для {connection.vendor}'
+        )
+
+    def as_sqlite(self, compiler, connection):
+        rhs, params = self.process_rhs(compiler, connection)
+        table = connection.ops.quote_name(self.lhs.alias)
+        return f'{table} MATCH {rhs}', [fts5_query(params[0])]
+
+    def as_postgresql(self, compiler, connection):
+        rhs, params = self.process_rhs(compiler, connection)
+        table = connection.ops.quote_name(self.lhs.alias)
+        return (
+            f'{table}.document @@ plainto_tsquery(%s::regconfig, {rhs})',
+            [SEARCH_CONFIG, *params],
+        )
+
+
+def fts5_query(text):
+    """Слова запроса в кавычках: FTS5 ищет посты, где есть все слова."""
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""'))
+        for word in text.split()
+    )
+
+
+class PostSearchKey(models.OneToOneField):
+    """Ссылка строки поискового индекса на пост; знает lookup ``match``."""
+
+
+PostSearchKey.register_lookup(SearchMatch)
+
+
+class PostSearch(models.Model):
+    """Строка полнотекстового индекса поста.
+
+    Таблица создаётся миграцией под конкретную СУБД: в SQLite это
+    виртуальная таблица FTS5, где ключом служит rowid, в PostgreSQL —
+    обычная таблица с колонкой rowid и tsvector под GIN-индексом.
+    Модель нужна только для соединения с постами в запросах.
+    """
+    post = PostSearchKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry',
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_search'
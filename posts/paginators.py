@@ -0,0 +1,228 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+from .constants import POSTS_PER_PAGE
+
+FEED_ORDERING = ('-pub_date', '-pk')
+COMMENT_ORDERINGS = {
+    'oldest': ('created', 'pk'),
+    'newest': ('-created', '-pk'),
+}
+PAGE_RANGE_ON_EACH_SIDE = 3
+PAGE_RANGE_ON_ENDS = 2
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Sequence):
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = (
+            paginator.encode_cursor(object_list[-1]) if has_next else None
+        )
+        self.previous_cursor = (
+            paginator.encode_cursor(object_list[0], reverse=True)
+            if has_previous else None
+        )
+
+    def __repr__(self):
+        return '<CursorPage of {} items>'.format(len(self))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу сортировки вместо OFFSET.
+
+    Курсор кодирует значения полей сортировки крайнего объекта страницы,
+    поэтому любая страница выбирается одним запросом по индексу, без
+    COUNT(*) и без пропуска предыдущих строк. Все поля сортировки должны
+    иметь одно направление, последним полем должен идти уникальный ключ.
+    Сортировать можно и по аннотациям queryset.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = ordering
+        self.descending = ordering[0].startswith('-')
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def _field(self, name):
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, obj, reverse=False):
+        values = []
+        for name in self.fields:
+            value = getattr(obj, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        payload = json.dumps({'v': values, 'r': reverse}).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            values = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, payload['v'])
+            ]
+            reverse = bool(payload['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError,
+                ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+        if len(values) != len(self.fields) or None in values:
+            raise InvalidCursor(cursor)
+        return values, reverse
+
+    def _seek(self, values, forward):
+        """Условие «строго после курсора» для составного ключа."""
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_name, prev_value in zip(self.fields, values[:index]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.object_list.order_by(*self.ordering)
+        if not cursor:
+            items = list(queryset[:self.per_page + 1])
+            return CursorPage(
+                items[:self.per_page], self,
+                has_next=len(items) > self.per_page,
+                has_previous=False,
+            )
+
+        values, reverse = self.decode_cursor(cursor)
+        if not reverse:
+            items = list(
+                queryset.filter(self._seek(values, forward=True))
+                [:self.per_page + 1]
+            )
+            return CursorPage(
+                items[:self.per_page], self,
+                has_next=len(items) > self.per_page,
+                has_previous=True,
+            )
+
+        items = list(
+            queryset.reverse().filter(self._seek(values, forward=False))
+            [:self.per_page + 1]
+        )
+        object_list = items[:self.per_page][::-1]
+        if not object_list:
+            return self.page()
+        return CursorPage(
+            object_list, self,
+            has_next=True,
+            has_previous=len(items) > self.per_page,
+        )
+
+    def get_page(self, cursor):
+        """Вернуть страницу, для некорректного курсора — первую."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    def first_page(self, total):
+        """Первая страница как срез QuerySet и курсор следующей.
+
+        Число объектов total известно заранее (например, из счётчика),
+        поэтому лишняя строка для has_next не выбирается.
+        """
+        items = self.object_list.order_by(*self.ordering)[:self.per_page]
+        count = len(items)
+        next_cursor = (
+            self.encode_cursor(items[count - 1]) if 0 < count < total
+            else None
+        )
+        return items, next_cursor
+
+
+def elided_page_range(page, on_each_side=PAGE_RANGE_ON_EACH_SIDE,
+                      on_ends=PAGE_RANGE_ON_ENDS):
+    """Номера страниц для навигации: края, текущая и соседние с ней.
+
+    Пропуски обозначены None, так что ссылок не больше
+    2 * (on_each_side + on_ends) + 1 при любом числе страниц. Повторяет
+    Paginator.get_elided_page_range из Django 3.2.
+    """
+    number = page.number
+    num_pages = page.paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2:
+        return list(range(1, num_pages + 1))
+    pages = []
+    if number > 1 + on_each_side + on_ends + 1:
+        pages += range(1, on_ends + 1)
+        pages.append(None)
+        pages += range(number - on_each_side, number + 1)
+    else:
+        pages += range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        pages += range(number + 1, number + on_each_side + 1)
+        pages.append(None)
+        pages += range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        pages += range(number + 1, num_pages + 1)
+    return pages
+
+
+def paginate(request, object_list, per_page=POSTS_PER_PAGE,
+             ordering=FEED_ORDERING):
+    """Вернуть пару (paginator, page) для ленты.
+
+    Запрос с ``?cursor=`` обслуживается CursorPaginator. Номерные
+    страницы ``?page=`` остаются для прямых переходов, но их ссылки
+    «вперёд»/«назад» тоже ведут на курсоры.
+    """
+    object_list = object_list.order_by(*ordering)
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        paginator = CursorPaginator(object_list, per_page, ordering)
+        return paginator, paginator.get_page(cursor)
+
+    paginator = Paginator(object_list, per_page)
+    page = paginator.get_page(request.GET.get('page'))
+    cursors = CursorPaginator(object_list, per_page, ordering)
+    page.next_cursor = (
+        cursors.encode_cursor(page[-1]) if page.has_next() else None
+    )
+    page.previous_cursor = (
+        cursors.encode_cursor(page[0], reverse=True)
+        if page.has_previous() else None
+    )
+    return paginator, page
@@ -0,0 +1,158 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс хранит для каждого поста его текст, название и описание группы
+и имя автора. В SQLite это виртуальная таблица FTS5, ранжирование —
+bm25; в PostgreSQL — tsvector с весами под GIN-индексом и ts_rank.
+Сигналы обновляют индекс при изменении постов, групп и имён авторов,
+поэтому поиск не сканирует таблицу постов через LIKE.
+
+Для остальных СУБД индекса нет: поиск идёт по icontains, все
+результаты получают одинаковый ранг.
+"""
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import SEARCH_CONFIG, Group, Post, PostSearch, User
+
+SEARCH_ORDERING = ('-search_rank', '-pk')
+BATCH_SIZE = 500
+
+# Веса колонок для bm25: текст, группа, автор.
+FTS5_WEIGHTS = (1.0, 0.5, 2.0)
+
+SEARCH_TABLE = PostSearch._meta.db_table
+
+
+def enabled():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _rank(query):
+    if connection.vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in FTS5_WEIGHTS)
+        # bm25 тем меньше, чем лучше совпадение; меняем знак, чтобы
+        # ранг, как и в PostgreSQL, рос с релевантностью.
+        return RawSQL(
+            f'-bm25("{SEARCH_TABLE}", {weights})', [],
+            output_field=FloatField(),
+        )
+    return RawSQL(
+        f'ts_rank("{SEARCH_TABLE}".document, '
+        'plainto_tsquery(%s::regconfig, %s))',
+        [SEARCH_CONFIG, query],
+        output_field=FloatField(),
+    )
+
+
+def search_posts(query):
+    """Посты по запросу с рангом search_rank для SEARCH_ORDERING."""
+    query = ' '.join(query.split())
+    posts = Post.objects.for_feed()
+    if not query or not enabled():
+        posts = posts.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+        if not query:
+            return posts.none()
+        return posts.filter(
+            Q(text__icontains=query)
+            | Q(group__title__icontains=query)
+            | Q(group__description__icontains=query)
+            | Q(author__username__icontains=query)
+        )
+    return posts.filter(search_entry__match=query).annotate(
+        search_rank=_rank(query)
+    )
+
+
+def _source_sql(where):
+    return (
+        f'FROM {Post._meta.db_table} p '
+        f'INNER JOIN {User._meta.db_table} u ON u.id = p.author_id '
+        f'LEFT OUTER JOIN {Group._meta.db_table} g ON g.id = p.group_id '
+        f'WHERE {where}'
+    )
+
+
+def _index(where, params, detach_group=False):
+    """Переписать строки индекса для постов, подходящих под where."""
+    if not enabled():
+        return
+    group_text = (
+        "''" if detach_group
+        else "COALESCE(g.title || ' ' || g.description, '')"
+    )
+    source = _source_sql(where)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN '
+                f'(SELECT p.id {source})',
+                params,
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} '
+                '(rowid, text, group_text, author) '
+                f'SELECT p.id, p.text, {group_text}, u.username {source}',
+                params,
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, document) '
+                'SELECT p.id, '
+                "setweight(to_tsvector(%s::regconfig, p.text), 'B') || "
+                f"setweight(to_tsvector(%s::regconfig, {group_text}), 'C') || "
+                "setweight(to_tsvector('simple', u.username), 'A') "
+                f'{source} '
+                'ON CONFLICT (rowid) '
+                'DO UPDATE SET document = EXCLUDED.document',
+                [SEARCH_CONFIG, SEARCH_CONFIG, *params],
+            )
+
+
+def index_post(post_id):
+    _index('p.id = %s', [post_id])
+
+
+def index_posts(post_ids):
+    post_ids = list(post_ids)
+    if post_ids:
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        _index(f'p.id IN ({placeholders})', post_ids)
+
+
+def index_group(group_id, detach=False):
+    """Обновить посты группы; detach — группа удаляется из постов."""
+    _index('p.group_id = %s', [group_id], detach_group=detach)
+
+
+def index_author(user_id):
+    _index('p.author_id = %s', [user_id])
+
+
+def remove_post(post_id):
+    # В PostgreSQL строку удаляет внешний ключ с ON DELETE CASCADE.
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+def rebuild():
+    """Переиндексировать все посты пачками, вернуть их число."""
+    if not enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    post_ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(post_ids.filter(pk__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            return total
+        _index('p.id BETWEEN %s AND %s', [batch[0], batch[-1]])
+        total += len(batch)
+        last_id = batch[-1]
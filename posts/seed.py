@@ -0,0 +1,153 @@
+"""Наполнение базы правдоподобными данными для тестов и нагрузки.
+
+Объекты создаются через bulk_create, минуя сигналы, поэтому после
+вставки счётчики, ленты подписок и поисковый индекс пересчитываются
+целиком. Популярность авторов и постов распределена по степенному
+закону: немногие авторы собирают большинство подписчиков, немногие
+посты — большинство комментариев. Самые активные авторы выбираются
+независимо от самых популярных, иначе ленты подписок разрастаются на
+порядки больше, чем на живом сайте.
+"""
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from . import counters, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 1000
+USERNAME_PREFIX = 'seed'
+
+
+def _last_pk(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True)
+    return last.first() or 0
+
+
+def _ids_after(model, pk):
+    return list(
+        model.objects.filter(pk__gt=pk).order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def _bulk_create(model, objs, **kwargs):
+    """bulk_create порциями, не собирая все объекты в памяти.
+
+    Размер запроса внутри порции Django подбирает сам по ограничениям
+    СУБД: в Django 2.2 явный batch_size эти ограничения не учитывает.
+    """
+    objs = iter(objs)
+    while True:
+        batch = list(islice(objs, BATCH_SIZE))
+        if not batch:
+            return
+        model.objects.bulk_create(batch, **kwargs)
+
+
+def _popular(rng, count):
+    """Индекс от 0 до count - 1, малые индексы выпадают чаще.
+
+    Распределение логарифмически равномерное: первые десять индексов
+    из тысячи выпадают примерно в трети случаев.
+    """
+    return int(count ** rng.random()) - 1
+
+
+@transaction.atomic
+def seed(users=1000, groups=20, posts=3000, comments=5000, follows=5000,
+         random_seed=0):
+    """Создать данные и вернуть словарь с числом созданных объектов."""
+    rng = random.Random(random_seed)
+    password = make_password(None)
+
+    last_user, last_group, last_post = (
+        _last_pk(User), _last_pk(Group), _last_pk(Post)
+    )
+    _bulk_create(
+        User,
+        (
+            User(
+                username=f'{USERNAME_PREFIX}{last_user + i}',
+                password=password,
+            )
+            for i in range(1, users + 1)
+        ),
+    )
+    user_ids = _ids_after(User, last_user)
+    posters = user_ids[:]
+    rng.shuffle(posters)
+
+    _bulk_create(
+        Group,
+        (
+            Group(
+                title=f'Группа {last_group + i}',
+                slug=f'{USERNAME_PREFIX}-group-{last_group + i}',
+                description=f'Описание группы {last_group + i}',
+            )
+            for i in range(1, groups + 1)
+        ),
+    )
+    group_ids = _ids_after(Group, last_group)
+
+    _bulk_create(
+        Post,
+        (
+            Post(
+                text=f'Пост {i}: ' + ' '.join(
+                    rng.choice(('новости', 'заметки', 'фото', 'путешествия',
+                                'рецепты', 'мысли', 'книги', 'музыка'))
+                    for _ in range(rng.randint(5, 40))
+                ),
+                author_id=posters[_popular(rng, len(posters))],
+                group_id=(
+                    rng.choice(group_ids)
+                    if group_ids and rng.random() < 0.5 else None
+                ),
+            )
+            for i in range(posts)
+        ),
+    )
+    post_ids = _ids_after(Post, last_post)
+
+    _bulk_create(
+        Comment,
+        (
+            Comment(
+                post_id=post_ids[_popular(rng, len(post_ids))],
+                author_id=rng.choice(user_ids),
+                text=f'Комментарий {i}',
+            )
+            for i in range(comments)
+        ),
+    )
+
+    pairs = set()
+    for _ in range(follows * 2):
+        if len(pairs) >= follows:
+            break
+        user_id = rng.choice(user_ids)
+        author_id = user_ids[_popular(rng, len(user_ids))]
+        if user_id != author_id:
+            pairs.add((user_id, author_id))
+    _bulk_create(
+        Follow,
+        (Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in pairs),
+        ignore_conflicts=True,
+    )
+
+    counters.recount_posts(Post.objects.filter(pk__gt=last_post))
+    counters.recount_authors()
+    timeline.rebuild(User.objects.filter(pk__gt=last_user))
+    search.rebuild()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_ids),
+        'comments': comments,
+        'follows': len(pairs),
+    }
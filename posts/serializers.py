@@ -0,0 +1,69 @@
+"""Компактное JSON-представление постов и комментариев.
+
+Если установлен orjson, ответы сериализуются, а строки импорта
+разбираются им, иначе — стандартным json (ответы без пробелов). Даты
+приводятся к ISO 8601 заранее, поэтому вывод обоих вариантов совпадает.
+"""
+import json
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Поля, которые нужны для сериализации поста: остальные колонки
+# (и связанные таблицы целиком) из БД не выбираются.
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'comments_count',
+    'author', 'author__username',
+    'group', 'group__slug', 'group__title',
+)
+COMMENT_FIELDS = (
+    'id', 'text', 'created', 'post', 'author', 'author__username',
+)
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(
+        data, ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        dumps(data), content_type='application/json', status=status
+    )
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': {
+            'slug': post.group.slug,
+            'title': post.group.title,
+        } if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
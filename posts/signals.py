@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import cache, counters, search, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        with transaction.atomic():
+            counters.bump_author(instance.author_id, posts_count=1)
+            timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def feed_changed(sender, instance, **kwargs):
+    post = instance
+    if sender is Comment:
+        post = (
+            instance.post if Comment.post.is_cached(instance)
+            else Post.objects.filter(pk=instance.post_id).first()
+        )
+    if post is not None:
+        cache.bump_feeds_on_commit(*cache.post_feeds(post))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cache.bump_feeds_on_commit(
+        cache.INDEX_FEED, cache.GROUPS_FEED, cache.group_feed(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def profile_card_changed(sender, instance, **kwargs):
+    cache.bump_feeds_on_commit(
+        cache.profile_feed(instance.user_id),
+        cache.profile_feed(instance.author_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        with transaction.atomic():
+            counters.follow_changed(instance.user_id, instance.author_id, 1)
+            timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    with transaction.atomic():
+        counters.follow_changed(instance.user_id, instance.author_id, -1)
+        timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, **kwargs):
+    search.index_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def group_indexed(sender, instance, created, **kwargs):
+    if not created:
+        search.index_group(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def group_unindexed(sender, instance, **kwargs):
+    # После удаления у постов уже не найти бывшую группу.
+    search.index_group(instance.pk, detach=True)
+
+
+@receiver(post_save, sender=User)
+def author_indexed(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None
+                        or 'username' in update_fields):
+        search.index_author(instance.pk)
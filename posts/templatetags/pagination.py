@@ -0,0 +1,11 @@
+from django import template
+
+from posts.paginators import elided_page_range
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_range(page):
+    """Номера страниц для includes/paginator.html, None — пропуск."""
+    return elided_page_range(page)
@@ -0,0 +1,50 @@
+from django import template
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from posts import cache as feed_cache
+from posts.constants import POST_CARD_TIMEOUT
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post_item.html'
+ACTIONS_TEMPLATE = 'includes/post_actions.html'
+# Место кнопок в закешированной карточке; по нему она делится на две
+# части, между которыми вставляются кнопки текущего посетителя.
+ACTIONS_SLOT = mark_safe('<!-- post-actions -->')
+
+
+def _render_card(card, context, post):
+    with context.push(post=post, post_actions=ACTIONS_SLOT):
+        head, tail = card.render(context).split(ACTIONS_SLOT)
+    return head, tail
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов ленты за один проход.
+
+    Карточка без кнопок одинакова для всех посетителей и всех лент,
+    поэтому хранится в кеше под ключом с поколением поста
+    (feed_cache.post_card_keys) и достаётся для всей страницы одним
+    get_many. Шаблоны отрисовываются только для промахов, а кнопки —
+    маленький post_actions.html — для каждого поста в контексте
+    страницы.
+    """
+    posts = list(posts)
+    engine = context.template.engine
+    keys = feed_cache.post_card_keys(posts)
+    cards = cache.get_many(keys)
+    missing = {}
+    actions = engine.get_template(ACTIONS_TEMPLATE)
+    html = []
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            card = engine.get_template(CARD_TEMPLATE)
+            cards[key] = missing[key] = _render_card(card, context, post)
+        head, tail = cards[key]
+        with context.push(post=post):
+            html.extend((head, actions.render(context), tail))
+    if missing:
+        cache.set_many(missing, POST_CARD_TIMEOUT)
+    return mark_safe(''.join(html))
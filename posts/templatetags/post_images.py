@@ -0,0 +1,10 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def card_image(image):
+    return thumbnails.card_image(image)
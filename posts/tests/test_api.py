@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.constants import COMMENTS_PER_PAGE
+from posts.models import Group, Post
+
+
+class FeedApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.follower = get_user_model().objects.create(username='Nikita')
+        self.follower.follower.create(author=self.user)
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+        self.group = Group.objects.create(
+            title='Заголовок группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        self.posts = [
+            Post.objects.create(
+                text=f'Текст поста {i}', author=self.user, group=self.group
+            )
+            for i in range(15)
+        ]
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты отдают страницы по курсору со ссылкой на следующую"""
+        urls = (
+            (self.guest_client, reverse('api:posts')),
+            (self.guest_client,
+             reverse('api:group_posts', args=[self.group.slug])),
+            (self.guest_client,
+             reverse('api:profile_posts', args=[self.user.username])),
+            (self.follower_client, reverse('api:follow')),
+        )
+        expected = [post.pk for post in reversed(self.posts)]
+        for client, url in urls:
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                ids = [post['id'] for post in data['results']]
+                self.assertIsNone(data['previous'])
+                data = client.get(data['next']).json()
+                ids += [post['id'] for post in data['results']]
+                self.assertIsNone(data['next'])
+                self.assertEqual(ids, expected)
+
+        post = self.guest_client.get(
+            reverse('api:posts'), {'limit': 1}
+        ).json()['results'][0]
+        self.assertEqual(post['author'], self.user.username)
+        self.assertEqual(post['group']['slug'], self.group.slug)
+        self.assertEqual(post['comments_count'], 0)
+
+    def test_only_needed_columns_are_selected(self):
+        """Из БД не выбираются лишние колонки автора и поста"""
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('api:posts'))
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('"auth_user"."username"', sql)
+        self.assertNotIn('"auth_user"."password"', sql)
+        self.assertNotIn('"posts_group"."description"', sql)
+
+    def test_etag(self):
+        """Повторный запрос с тем же ETag получает 304"""
+        for client, url in (
+            (self.guest_client, reverse('api:posts')),
+            (self.follower_client, reverse('api:follow')),
+        ):
+            with self.subTest(url=url):
+                etag = client.get(url)['ETag']
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_errors(self):
+        """Ошибки тоже отдаются в JSON"""
+        response = self.guest_client.get(reverse('api:follow'))
+        self.assertEqual(response.status_code, 401)
+        response = self.guest_client.get(
+            reverse('api:group_posts', args=['missing'])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        response = self.guest_client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_post_with_comments(self):
+        """Пост отдаётся с первой порцией комментариев"""
+        post = self.posts[0]
+        for i in range(COMMENTS_PER_PAGE + 1):
+            post.comments.create(author=self.follower, text=f'Коммент {i}')
+        data = self.guest_client.get(
+            reverse('api:post', args=[post.pk])
+        ).json()
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(len(data['comments']), COMMENTS_PER_PAGE)
+        self.assertEqual(data['comments'][0]['author'], 'Nikita')
+
+        rest = self.guest_client.get(data['comments_next']).json()
+        self.assertEqual(
+            [comment['text'] for comment in rest['results']],
+            [f'Коммент {COMMENTS_PER_PAGE}'],
+        )
@@ -0,0 +1,151 @@
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import seed
+from posts.models import AuthorStats, Post
+
+# Объём данных, на котором проверяются бюджеты. N+1 проявляется уже
+# на одной странице, а тысячи строк делают заметными полные просмотры.
+SEED = {
+    'users': 1000,
+    'groups': 20,
+    'posts': 3000,
+    'comments': 5000,
+    'follows': 5000,
+}
+
+# Время на один запрос в секундах; на медленных машинах CI его можно
+# увеличить переменной окружения.
+TIME_BUDGET = float(os.environ.get('YATUBE_VIEW_TIME_BUDGET', 0.5))
+
+
+class ViewBudgetTests(TestCase):
+    """Число SQL-запросов и время ответа каждой страницы в пределах бюджета.
+
+    Бюджеты запросов берутся из REQUEST_QUERY_BUDGETS — тех же, по
+    которым RequestMetricsMiddleware предупреждает в логе. Кеш очищается
+    перед каждым запросом, поэтому меряется худший случай.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed.seed(**SEED)
+        cls.author = AuthorStats.objects.order_by(
+            '-followers_count'
+        ).select_related('user').first().user
+        cls.follower = AuthorStats.objects.order_by(
+            '-following_count'
+        ).select_related('user').first().user
+        cls.post = Post.objects.order_by('-comments_count').first()
+        cls.group = Post.objects.exclude(group=None).first().group
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+
+    def request(self, client, url, method='get', data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - started
+        return response, len(queries), elapsed
+
+    def assert_within_budget(self, name, client, url, method='get',
+                             data=None, status=200):
+        response, queries, elapsed = self.request(client, url, method, data)
+        self.assertEqual(response.status_code, status)
+        budget = settings.REQUEST_QUERY_BUDGETS[name]
+        self.assertLessEqual(
+            queries, budget, f'{url}: {queries} запросов при бюджете {budget}'
+        )
+        self.assertLess(
+            elapsed, TIME_BUDGET,
+            f'{url}: {elapsed:.3f} с при бюджете {TIME_BUDGET} с'
+        )
+
+    def test_read_views(self):
+        """Ленты, профиль и страница поста укладываются в бюджет"""
+        pages = {
+            'index': reverse('index'),
+            'group': reverse('group', args=[self.group.slug]),
+            'profile': reverse('profile', args=[self.author.username]),
+            'post': reverse(
+                'post', args=[self.post.author.username, self.post.pk]
+            ),
+            'post_comments': reverse(
+                'post_comments',
+                args=[self.post.author.username, self.post.pk],
+            ),
+        }
+        for client_name, client in (
+            ('guest', self.guest_client),
+            ('authorized', self.authorized_client),
+        ):
+            for name, url in pages.items():
+                with self.subTest(client=client_name, url=url):
+                    self.assert_within_budget(name, client, url)
+                    self.assert_within_budget(
+                        name, client, url, data={'page': 3}
+                    )
+
+    def test_api_views(self):
+        """JSON API укладывается в те же бюджеты, что и страницы"""
+        pages = {
+            'api:posts': reverse('api:posts'),
+            'api:group_posts': reverse(
+                'api:group_posts', args=[self.group.slug]
+            ),
+            'api:profile_posts': reverse(
+                'api:profile_posts', args=[self.author.username]
+            ),
+            'api:post': reverse('api:post', args=[self.post.pk]),
+            'api:post_comments': reverse(
+                'api:post_comments', args=[self.post.pk]
+            ),
+        }
+        for name, url in pages.items():
+            with self.subTest(url=url):
+                self.assert_within_budget(name, self.guest_client, url)
+        self.assert_within_budget(
+            'api:follow', self.authorized_client, reverse('api:follow')
+        )
+
+    def test_follow_index(self):
+        """Лента подписок укладывается в бюджет"""
+        self.assertTrue(self.follower.timeline.exists())
+        self.assert_within_budget(
+            'follow_index', self.authorized_client, reverse('follow_index')
+        )
+
+    def test_add_comment(self):
+        """Добавление комментария укладывается в бюджет"""
+        self.assert_within_budget(
+            'add_comment', self.authorized_client,
+            reverse('add_comment', args=[
+                self.post.author.username, self.post.pk
+            ]),
+            method='post', data={'text': 'Комментарий'}, status=302,
+        )
+        self.assertTrue(self.post.comments.filter(
+            author=self.follower, text='Комментарий'
+        ).exists())
+
+    def test_budgets_do_not_depend_on_page_size(self):
+        """Число запросов к посту не растёт с числом комментариев"""
+        url = reverse('post', args=[self.post.author.username, self.post.pk])
+        _, before, _ = self.request(self.guest_client, url)
+        user = get_user_model().objects.first()
+        for i in range(20):
+            self.post.comments.create(author=user, text=f'Ещё {i}')
+        _, after, _ = self.request(self.guest_client, url)
+        self.assertEqual(before, after)
@@ -1,19 +1,31 @@
+import tempfile
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.cache import cache, caches
+from django.db import connection, transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Post
+from posts import cache as feed_cache
+from posts.models import Group, Post
+from yatube.cache import TwoTierCache
 
 
 class PageCacheTests(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
         self.user = get_user_model().objects.create(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
 
-        Post.objects.create(
+        self.post = Post.objects.create(
             text='Текст поста 1',
             author=self.user,
         )
@@ -21,12 +33,315 @@ class PageCacheTests(TestCase):
     def test_index_page_post_cache(self):
         """Проверяем кеширование вывода постов на главной странице"""
         response = self.guest_client.get(reverse('index'))
-        Post.objects.create(
-            text='Текст поста 2',
-            author=self.user,
-        )
+        Post.objects.filter(pk=self.post.pk).update(text='Изменено в обход')
         response2 = self.guest_client.get(reverse('index'))
         self.assertEqual(str(response.content), str(response2.content))
         cache.clear()
         response3 = self.guest_client.get(reverse('index'))
         self.assertNotEqual(str(response.content), str(response3.content))
+
+    def test_new_post_invalidates_index_cache(self):
+        """Новый пост сразу появляется на закешированной главной"""
+        self.guest_client.get(reverse('index'))
+        Post.objects.create(
+            text='Текст поста 2',
+            author=self.user,
+        )
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Текст поста 2')
+
+    def test_comment_and_group_invalidate_index_cache(self):
+        """Комментарий и изменение группы обновляют главную"""
+        group = Group.objects.create(
+            title='Старое название',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        cache.clear()
+        self.guest_client.get(reverse('index'))
+
+        self.post.comments.create(author=self.user, text='Комментарий')
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Комментариев: 1')
+
+        group.title = 'Новое название'
+        group.save()
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Новое название')
+
+    def test_index_cache_varies_by_page_and_user(self):
+        """Страницы и пользователи не делят один закешированный фрагмент"""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.user) for i in range(12)
+        )
+        cache.clear()
+        first = self.guest_client.get(reverse('index'))
+        second = self.guest_client.get(reverse('index'), {'page': 2})
+        self.assertNotEqual(first.content, second.content)
+
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'Редактировать')
+        self.assertNotContains(first, 'Редактировать')
+
+
+class FeedVersionTests(TestCase):
+
+    def test_bump_does_not_rely_on_incr(self):
+        """Поколение меняется без incr, неатомарного в файловом кеше"""
+        with tempfile.TemporaryDirectory() as location:
+            with self.settings(CACHES={'default': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'
+                ),
+                'LOCATION': location,
+            }}), mock.patch(
+                'django.core.cache.backends.filebased.FileBasedCache.incr',
+                side_effect=AssertionError('incr'),
+            ):
+                feed = feed_cache.post_feed(1)
+                versions = {feed_cache.feed_version(feed)}
+                for _ in range(3):
+                    feed_cache.bump_feeds(feed)
+                    versions.add(feed_cache.feed_version(feed))
+                self.assertEqual(len(versions), 4)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-tests',
+    },
+})
+class TwoTierCacheTests(TestCase):
+
+    def make_worker(self, name):
+        return TwoTierCache(name, {
+            'OPTIONS': {'SHARED': 'shared', 'LOCAL_TIMEOUT': 60},
+        })
+
+    def setUp(self):
+        self.worker_1 = self.make_worker('worker-1')
+        self.worker_2 = self.make_worker('worker-2')
+        self.worker_1.clear()
+        self.worker_2.local.clear()
+
+    def test_value_is_shared_between_workers(self):
+        """Значение, записанное одним воркером, читается другим из L2"""
+        self.worker_1.set('key', 'value')
+        self.assertEqual(self.worker_2.get('key'), 'value')
+        self.assertEqual(self.worker_2.stats['shared_hits'], 1)
+
+        self.assertEqual(self.worker_2.get('key'), 'value')
+        self.assertEqual(self.worker_2.stats['local_hits'], 1)
+
+    def test_local_tier_serves_reads_without_shared(self):
+        """Повторное чтение не обращается к общему кешу"""
+        self.worker_1.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(self.worker_1.get('key'), 'value')
+        self.assertIsNone(self.worker_2.get('key'))
+
+    def test_writes_go_through_both_tiers(self):
+        """incr и delete проходят сквозь оба уровня"""
+        self.worker_1.set('counter', 1)
+        self.assertEqual(self.worker_1.incr('counter'), 2)
+        self.assertEqual(caches['shared'].get('counter'), 2)
+        self.assertEqual(self.worker_2.get('counter'), 2)
+
+        self.worker_1.delete('counter')
+        self.assertIsNone(self.worker_1.get('counter'))
+        self.assertIsNone(caches['shared'].get('counter'))
+
+
+class AnonymousPageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+        self.group = Group.objects.create(
+            title='Заголовок группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        self.post = Post.objects.create(
+            text='Текст поста',
+            author=self.user,
+            group=self.group,
+        )
+        self.urls = (
+            reverse('index'),
+            reverse('group', args=[self.group.slug]),
+            reverse('profile', args=[self.user.username]),
+            reverse('post', args=[self.user.username, self.post.id]),
+        )
+
+    def test_not_modified_for_matching_etag(self):
+        """Совпадающий If-None-Match получает 304 без рендеринга"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+
+    def test_repeated_request_served_from_cache(self):
+        """Повторный запрос отдаёт сохранённый HTML без шаблонов"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                second = self.guest_client.get(url)
+                self.assertFalse(second.templates)
+                self.assertEqual(first.content, second.content)
+
+    def test_changes_update_etag(self):
+        """Новый комментарий и правка поста меняют ETag"""
+        url = reverse('post', args=[self.user.username, self.post.id])
+        etag = self.guest_client.get(url)['ETag']
+
+        self.post.comments.create(author=self.user, text='Комментарий')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+        etag = response['ETag']
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Исправленный текст')
+
+    def test_conditional_request_does_not_scan_comments(self):
+        """Валидаторы считаются без запросов к постам и комментариям"""
+        url = reverse('group', args=[self.group.slug])
+        response = self.guest_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('posts_comment', queries[0]['sql'])
+
+    def test_comment_updates_last_modified(self):
+        """Новый комментарий сдвигает Last-Modified даже в ту же секунду"""
+        url = reverse('post', args=[self.user.username, self.post.id])
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        self.post.comments.create(author=self.user, text='Комментарий')
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+    def test_authorized_user_is_not_cached(self):
+        """Авторизованным пользователям страница рендерится заново"""
+        self.authorized_client.get(reverse('index'))
+        response = self.authorized_client.get(reverse('index'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertTrue(response.templates)
+
+
+class PostCardCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create(username='StasBasov')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader = get_user_model().objects.create(username='reader')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+        self.group = Group.objects.create(
+            title='Заголовок группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        self.post = Post.objects.create(
+            text='Текст поста',
+            author=self.author,
+            group=self.group,
+        )
+        self.url = reverse('group', args=[self.group.slug])
+
+    def template_names(self, response):
+        return [template.name for template in response.templates]
+
+    def test_feeds_reuse_cached_cards(self):
+        """Карточка рисуется один раз для всех лент и посетителей"""
+        response = self.reader_client.get(self.url)
+        self.assertIn('includes/post_item.html', self.template_names(response))
+        for client, url in (
+            (self.reader_client, self.url),
+            (self.author_client, self.url),
+            (self.reader_client, reverse('profile', args=['StasBasov'])),
+        ):
+            with self.subTest(url=url):
+                response = client.get(url)
+                names = self.template_names(response)
+                self.assertNotIn('includes/post_item.html', names)
+                self.assertIn('includes/post_actions.html', names)
+                self.assertContains(response, 'Текст поста')
+
+    def test_actions_depend_on_viewer(self):
+        """Кнопки под закешированной карточкой свои у каждого посетителя"""
+        edit_url = reverse('post_edit', args=['StasBasov', self.post.pk])
+        self.assertContains(self.author_client.get(self.url), edit_url)
+        response = self.reader_client.get(self.url)
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, 'Добавить комментарий')
+        response = Client().get(self.url)
+        self.assertNotContains(response, edit_url)
+        self.assertNotContains(response, 'Смотреть комментарии')
+
+    def test_changes_refresh_card(self):
+        """Правка поста, комментарий и правка группы обновляют карточку"""
+        self.reader_client.get(self.url)
+        self.author_client.post(
+            reverse('post_edit', args=['StasBasov', self.post.pk]),
+            {'text': 'Исправленный текст', 'group': self.group.pk},
+        )
+        self.assertContains(
+            self.reader_client.get(self.url), 'Исправленный текст'
+        )
+
+        self.reader_client.post(
+            reverse('add_comment', args=['StasBasov', self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertContains(
+            self.reader_client.get(self.url), 'Комментариев: 1'
+        )
+
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(
+            self.reader_client.get(self.url), '#Новое название'
+        )
+
+
+class FeedBumpOnCommitTests(TransactionTestCase):
+
+    def test_generation_moves_after_commit(self):
+        """Поколение ленты сдвигается ещё раз после фиксации транзакции"""
+        cache.clear()
+        user = get_user_model().objects.create(username='StasBasov')
+        post = Post.objects.create(text='Текст поста', author=user)
+        feed = feed_cache.post_feed(post.pk)
+        with transaction.atomic():
+            post.comments.create(author=user, text='Комментарий')
+            # Страница, прочитанная конкурентным запросом до COMMIT,
+            # попала бы в кеш под этим поколением.
+            before_commit = feed_cache.feed_version(feed)
+        self.assertNotEqual(feed_cache.feed_version(feed), before_commit)
@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+
+
+class LoadCommandsTests(TransactionTestCase):
+
+    def call(self, *args):
+        out = StringIO()
+        call_command(*args, stdout=out)
+        return out.getvalue()
+
+    def test_seed_load_and_bench_load(self):
+        """seed_load наполняет базу, bench_load выводит перцентили"""
+        self.call(
+            'seed_load', '--users=50', '--groups=3', '--posts=200',
+            '--comments=300', '--follows=100',
+        )
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Follow.objects.count(), 100)
+        self.assertTrue(TimelineEntry.objects.exists())
+
+        output = self.call(
+            'bench_load', '--threads=2', '--requests=10', '--signed-in=0.5',
+        )
+        header, *rows, total = output.splitlines()
+        self.assertIn('p99', header)
+        self.assertTrue(rows)
+        for row in rows:
+            with self.subTest(row=row):
+                self.assertEqual(row.split()[-1], '0')
+        self.assertIn('Всего 20 запросов', total)
+
+    def test_bench_writes(self):
+        """bench_writes добавляет комментарии и выводит перцентили"""
+        self.call(
+            'seed_load', '--users=10', '--groups=1', '--posts=20',
+            '--comments=20', '--follows=10',
+        )
+        # Тестовая база SQLite в памяти блокирует таблицы целиком и не
+        # ждёт busy_timeout, поэтому здесь пишет один поток.
+        output = self.call('bench_writes', '--threads=1', '--requests=4')
+        self.assertIn('p99', output)
+        self.assertIn('Ошибки: нет', output)
+        self.assertEqual(Comment.objects.count(), 20 + 4)
+
+    def test_bench_templates(self):
+        """bench_templates сравнивает include и post_cards с кешем и без"""
+        self.call(
+            'seed_load', '--users=5', '--groups=1', '--posts=5',
+            '--comments=0', '--follows=0',
+        )
+        output = self.call('bench_templates', '--repeat=2')
+        header, *rows = output.splitlines()
+        self.assertIn('Постов на странице: 5', header)
+        self.assertEqual(
+            [row.split()[:2] for row in rows],
+            [['plain', 'include'], ['plain', 'post_cards'],
+             ['cached', 'include'], ['cached', 'post_cards']],
+        )
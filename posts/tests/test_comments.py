@@ -1,7 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.query import QuerySet
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts.constants import COMMENTS_PER_PAGE
 from posts.models import Comment, Post
 
 
@@ -72,3 +77,77 @@ class CommentsTests(TestCase):
             )
         )
         self.assertEqual(Comment.objects.count(), comment_count)
+
+
+class CommentPagesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.post = Post.objects.create(text='Текст поста', author=self.user)
+        for i in range(COMMENTS_PER_PAGE + 5):
+            self.post.comments.create(author=self.user, text=f'Коммент {i}')
+        self.post_url = reverse(
+            'post', args=[self.user.username, self.post.id]
+        )
+        self.comments_url = reverse(
+            'post_comments', args=[self.user.username, self.post.id]
+        )
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_post_page_shows_first_chunk(self):
+        """Страница поста показывает только первую порцию комментариев"""
+        response = self.guest_client.get(self.post_url)
+        comments = response.context['comments']
+        self.assertIsInstance(comments, QuerySet)
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Коммент 0')
+        self.assertTrue(response.context['comments_next_cursor'])
+
+        response = self.guest_client.get(
+            self.post_url, {'comments': 'newest'}
+        )
+        self.assertEqual(
+            response.context['comments'][0].text,
+            f'Коммент {COMMENTS_PER_PAGE + 4}',
+        )
+
+    def test_next_chunk_fragment_and_json(self):
+        """Следующая порция отдаётся фрагментом или JSON"""
+        cursor = self.guest_client.get(
+            self.post_url
+        ).context['comments_next_cursor']
+
+        response = self.guest_client.get(
+            self.comments_url, {'cursor': cursor}
+        )
+        self.assertEqual(
+            self.texts(response.context['comments']),
+            [f'Коммент {i}' for i in range(
+                COMMENTS_PER_PAGE, COMMENTS_PER_PAGE + 5
+            )],
+        )
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'Показать ещё')
+
+        data = self.guest_client.get(
+            self.comments_url, {'cursor': cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual(len(data['comments']), 5)
+        self.assertEqual(data['comments'][0]['author'], self.user.username)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_comments_queries_do_not_depend_on_count(self):
+        """Число запросов не зависит от числа комментариев"""
+        with CaptureQueriesContext(connection) as before:
+            self.guest_client.get(self.comments_url)
+        other = get_user_model().objects.create(username='Nikita')
+        for i in range(5):
+            self.post.comments.create(author=other, text=f'Ещё {i}')
+        cache.clear()
+        with CaptureQueriesContext(connection) as after:
+            self.guest_client.get(self.comments_url, {'comments': 'newest'})
+        self.assertEqual(len(before), len(after))
@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.forms import PostForm
+from posts.models import AuthorStats, Follow, Post
+
+
+class CountersTests(TestCase):
+
+    def setUp(self):
+        self.guest_client = Client()
+
+        self.user_author = get_user_model().objects.create(
+            username='StasBasov'
+        )
+        self.user_reader = get_user_model().objects.create(
+            username='Nikita'
+        )
+
+        self.post = Post.objects.create(
+            text='Текст поста',
+            author=self.user_author,
+        )
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Счётчики постов и комментариев меняются вместе с записями."""
+        Post.objects.create(text='Текст поста 2', author=self.user_author)
+        comment = self.post.comments.create(
+            author=self.user_reader, text='Комментарий'
+        )
+        self.assertEqual(self.get_stats(self.user_author).posts_count, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        comment.delete()
+        self.post.delete()
+        self.assertEqual(self.get_stats(self.user_author).posts_count, 1)
+
+    def test_edit_keeps_concurrent_comments(self):
+        """Правка поста не затирает счётчик комментариев, добавленных
+        после его загрузки."""
+        stale = Post.objects.get(pk=self.post.pk)
+        self.post.comments.create(author=self.user_reader, text='Комментарий')
+        form = PostForm({'text': 'Исправленный текст'}, instance=stale)
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Исправленный текст')
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_follow_counters(self):
+        """Счётчики подписчиков и подписок меняются при (от)писке."""
+        follow = Follow.objects.create(
+            user=self.user_reader, author=self.user_author
+        )
+        self.assertEqual(self.get_stats(self.user_author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.user_reader).following_count, 1)
+
+        follow.delete()
+        self.assertEqual(self.get_stats(self.user_author).followers_count, 0)
+        self.assertEqual(self.get_stats(self.user_reader).following_count, 0)
+
+    def test_profile_reads_counters(self):
+        """Профиль показывает счётчики без подсчёта строк."""
+        Follow.objects.create(user=self.user_reader, author=self.user_author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('profile', args=[self.user_author.username]),
+                {'cursor': ''},
+            )
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+        self.assertEqual(response.context.get('author_posts_count'), 1)
+        self.assertEqual(response.context.get('subscribers'), 1)
+        self.assertEqual(response.context.get('subscriptions'), 0)
+
+    def test_recount_command_repairs_drift(self):
+        """Команда recount исправляет счётчики после записи в обход ORM."""
+        Post.objects.bulk_create(
+            Post(text='Текст поста', author=self.user_author)
+            for _ in range(3)
+        )
+        AuthorStats.objects.filter(user=self.user_reader).delete()
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.get_stats(self.user_author).posts_count, 4)
+        self.assertTrue(
+            AuthorStats.objects.filter(user=self.user_reader).exists()
+        )
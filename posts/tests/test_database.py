@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+
+class DatabaseSettingsTests(TestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_pragmas(self):
+        """Соединение с SQLite настроено на конкурентную запись"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Только для SQLite')
+        # 1 — NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(
+            self.pragma('busy_timeout'), settings.SQLITE_BUSY_TIMEOUT
+        )
@@ -0,0 +1,140 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import importer
+from posts.models import Comment, Group, Post
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = get_user_model().objects.create(username='StasBasov')
+        self.reader = get_user_model().objects.create(username='Nikita')
+        self.staff = get_user_model().objects.create(
+            username='Admin', is_staff=True
+        )
+        self.group = Group.objects.create(
+            title='Заголовок группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.author,
+            group=self.group,
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        self.other_post = Post.objects.create(
+            text='Чужой пост', author=self.reader
+        )
+        self.comment = Comment.objects.create(
+            post=self.other_post, author=self.author, text='Комментарий'
+        )
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse('api:user_export', args=[self.author.username])
+
+    def export(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def staff_client(self):
+        client = Client()
+        client.force_login(self.staff)
+        return client
+
+    def test_ndjson_can_be_imported_back(self):
+        """Выгрузка в NDJSON принимается импортом как есть"""
+        lines = self.export(self.url).splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [(record['type'], record['id']) for record in records],
+            [('post', self.post.pk), ('comment', self.comment.pk)],
+        )
+        self.assertEqual(records[0]['group'], self.group.slug)
+        self.assertEqual(records[0]['image'], self.post.image.name)
+
+        pub_date = self.post.pub_date
+        Post.objects.filter(pk=self.post.pk).delete()
+        stats = importer.import_ndjson(lines)
+        self.assertEqual(stats.skipped, 0)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).pub_date, pub_date)
+        self.assertTrue(Comment.objects.filter(pk=self.comment.pk).exists())
+
+    def test_csv(self):
+        """Выгрузка в CSV с заголовком и строкой на запись"""
+        content = self.export(self.url, format='csv').decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['text'], self.post.text)
+        self.assertEqual(rows[1]['post'], str(self.other_post.pk))
+
+    def test_zip_contains_records_and_images(self):
+        """Архив группы содержит записи и исходные изображения"""
+        content = self.export(
+            reverse('api:group_export', args=[self.group.slug]),
+            client=self.staff_client(), format='zip',
+        )
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            records = archive.read('posts.ndjson').splitlines()
+            image = archive.read(f'media/{self.post.image.name}')
+        self.assertEqual(len(records), 1)
+        self.assertEqual(image, SMALL_GIF)
+
+    def test_access(self):
+        """Свои посты выгружает автор, чужие и группы — сотрудники"""
+        group_url = reverse('api:group_export', args=[self.group.slug])
+        self.assertEqual(Client().get(self.url).status_code, 401)
+        reader = Client()
+        reader.force_login(self.reader)
+        self.assertEqual(reader.get(self.url).status_code, 403)
+        self.assertEqual(reader.get(group_url).status_code, 403)
+        self.assertEqual(
+            self.client.get(self.url, {'format': 'xml'}).status_code, 400
+        )
+        self.export(self.url, client=self.staff_client())
+        self.export(group_url, client=self.staff_client())
+
+    def test_command(self):
+        """Команда пишет выгрузку в файл"""
+        path = os.path.join(MEDIA_ROOT, 'export.ndjson')
+        call_command(
+            'export_posts', path, '--group', self.group.slug, stdout=StringIO()
+        )
+        with open(path, 'rb') as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual([record['id'] for record in records], [self.post.pk])
@@ -1,8 +1,13 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, TestCase, TransactionTestCase
 from django.urls import reverse
 
-from posts.models import Follow, Post
+from posts.models import Follow, Post, TimelineEntry
 
 
 class FollowTests(TestCase):
@@ -114,3 +119,65 @@ class FollowTests(TestCase):
         self.assertFalse(
             response_not_subscriber.context.get('page').object_list
         )
+
+    def test_timeline_follows_subscriptions(self):
+        """Лента подписок материализуется при подписке и отписке."""
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user_subscriber, post=self.post
+        ).exists())
+
+        self.authorized_not_subscriber.get(
+            reverse('profile_follow', args=[self.user_author.username])
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user_not_subscriber, post=self.post
+        ).exists())
+
+        self.authorized_not_subscriber.get(
+            reverse('profile_unfollow', args=[self.user_author.username])
+        )
+        response = self.authorized_not_subscriber.get(reverse('follow_index'))
+        self.assertFalse(response.context.get('page').object_list)
+
+    def test_backfill_timeline_command(self):
+        """Команда backfill_timeline восстанавливает ленты подписок."""
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timeline', stdout=StringIO())
+        response = self.authorized_subscriber.get(reverse('follow_index'))
+        self.assertEqual(
+            list(response.context.get('page').object_list), [self.post]
+        )
+
+
+class TimelineMigrationTests(TransactionTestCase):
+    before = [('posts', '0013_auto_20210131_0122')]
+    after = [('posts', '0014_timelineentry')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_migration_fills_timeline(self):
+        """Миграция раскладывает посты существующих подписок по лентам"""
+        apps = self.migrate(self.before)
+        User = apps.get_model('auth', 'User')
+        Follow = apps.get_model('posts', 'Follow')
+        Post = apps.get_model('posts', 'Post')
+        author = User.objects.create(username='StasBasov')
+        reader = User.objects.create(username='Nikita')
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(text='Старый пост', author=author)
+        Post.objects.create(text='Пост читателя', author=reader)
+
+        apps = self.migrate(self.after)
+        TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user_id', 'post_id')),
+            [(reader.pk, post.pk)],
+        )
@@ -1,9 +1,20 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.models import Group, Post
 
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
 
 class PostCreateFormTests(TestCase):
     def setUp(self):
@@ -66,3 +77,103 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(self.post.text, post_new_text)
         self.assertEqual(self.post.group, self.group)
         self.assertEqual(self.post.author, self.user)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    POST_THUMBNAILS_ASYNC=False,
+    POST_IMAGE_MAX_SIZE=2048,
+    POST_IMAGE_MAX_PIXELS=300 * 300,
+)
+class PostImageUploadTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def make_image(self, size, fmt='JPEG', **options):
+        content = BytesIO()
+        Image.new('RGB', size, color=(255, 0, 0)).save(content, fmt, **options)
+        return SimpleUploadedFile(
+            name='image.' + fmt.lower(),
+            content=content.getvalue(),
+            content_type=Image.MIME[fmt],
+        )
+
+    def make_noise(self, size):
+        return SimpleUploadedFile(
+            name='image.jpg',
+            content=os.urandom(size),
+            content_type='image/jpeg',
+        )
+
+    def post_image(self, image):
+        return self.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Текст поста', 'image': image},
+        )
+
+    def test_oversize_upload_rejected(self):
+        """Файл больше лимита отклоняется и пост не создаётся"""
+        for size in (4096, 128 * 1024):
+            with self.subTest(size=size):
+                response = self.post_image(self.make_noise(size))
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['image'])
+                self.assertFalse(Post.objects.exists())
+
+    def test_too_many_pixels_rejected(self):
+        """Изображение с большим числом точек отклоняется по заголовку"""
+        response = self.post_image(self.make_image((400, 400), 'PNG'))
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    def test_exif_is_stripped(self):
+        """EXIF удаляется из сохранённого изображения"""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        image = self.make_image((100, 100), exif=exif.tobytes())
+        self.assertRedirects(self.post_image(image), reverse('index'))
+
+        post = Post.objects.get()
+        with post.image.open() as saved:
+            saved_image = Image.open(saved)
+            self.assertEqual(saved_image.size, (100, 100))
+            self.assertFalse(saved_image.getexif())
+
+    def test_cmyk_tiff_is_saved_as_png(self):
+        """CMYK TIFF сохраняется как PNG с расширением .png"""
+        content = BytesIO()
+        Image.new('CMYK', (100, 100)).save(
+            content, 'TIFF', compression='tiff_lzw'
+        )
+        image = SimpleUploadedFile(
+            name='image.tiff',
+            content=content.getvalue(),
+            content_type='image/tiff',
+        )
+        self.assertRedirects(self.post_image(image), reverse('index'))
+
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.png'))
+        with post.image.open() as saved:
+            saved_image = Image.open(saved)
+            self.assertEqual(saved_image.format, 'PNG')
+            self.assertEqual(saved_image.mode, 'RGB')
+
+    def test_encoder_error_is_form_error(self):
+        """Ошибка кодировщика показывается в форме, а не приводит к 500"""
+        image = self.make_image((100, 100))
+        with mock.patch.object(
+            Image.Image, 'save', side_effect=OSError('encoder error')
+        ):
+            response = self.post_image(image)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
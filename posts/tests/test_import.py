@@ -0,0 +1,141 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import importer, search
+from posts.models import AuthorStats, Comment, Group, Post, TimelineEntry
+
+PUB_DATE = datetime(2019, 5, 1, 7, 0, tzinfo=timezone.utc)
+
+
+def ndjson(*records):
+    return [json.dumps(record).encode() for record in records]
+
+
+class ImportTests(TestCase):
+
+    def setUp(self):
+        self.author = get_user_model().objects.create(username='StasBasov')
+        self.follower = get_user_model().objects.create(username='Nikita')
+        self.follower.follower.create(author=self.author)
+        self.group = Group.objects.create(
+            title='Заголовок группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        self.records = ndjson(
+            {'type': 'post', 'id': 100, 'author': 'StasBasov',
+             'group': 'test-slug', 'text': 'Старый пост про котов',
+             'pub_date': '2019-05-01T10:00:00+03:00'},
+            {'type': 'post', 'author': 'StasBasov', 'text': 'Без ключа'},
+            {'type': 'comment', 'id': 7, 'post': 100, 'author': 'Nikita',
+             'text': 'Комментарий', 'created': '2019-05-02T08:00:00'},
+        )
+
+    def test_import_keeps_dates_and_keys(self):
+        """Импорт сохраняет ключи и даты и обновляет производные данные"""
+        stats = importer.import_ndjson(self.records, chunk_size=2)
+        self.assertEqual((stats.posts, stats.comments), (2, 1))
+        self.assertEqual(stats.skipped, 0)
+
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.pub_date, PUB_DATE)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.comments_count, 1)
+        comment = Comment.objects.get(pk=7)
+        self.assertEqual(
+            comment.created, datetime(2019, 5, 2, 8, tzinfo=timezone.utc)
+        )
+        self.assertEqual(AuthorStats.objects.get(
+            user=self.author
+        ).posts_count, 2)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2
+        )
+        if search.enabled():
+            self.assertEqual(list(search.search_posts('котов')), [post])
+
+        new_post = Post.objects.create(text='Новый', author=self.author)
+        self.assertGreater(new_post.pk, 100)
+
+    def test_reimport_skips_existing_keys(self):
+        """Повторный импорт не дублирует записи с ключами"""
+        stats = importer.import_ndjson(self.records[::2])
+        self.assertEqual((stats.posts, stats.comments), (1, 1))
+        stats = importer.import_ndjson(self.records[::2])
+        self.assertEqual((stats.posts, stats.comments), (0, 0))
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Post.objects.get(pk=100).comments_count, 1)
+
+    def test_invalid_lines_are_reported(self):
+        """Ошибочные строки пропускаются с указанием номера"""
+        stats = importer.import_ndjson([
+            b'{"type": "post"',
+            b'',
+            *ndjson(
+                {'type': 'post', 'author': 'nobody', 'text': 'Текст'},
+                {'type': 'post', 'author': 'StasBasov', 'text': 'Текст',
+                 'group': 'missing'},
+                {'type': 'comment', 'post': 999, 'author': 'Nikita',
+                 'text': 'Текст'},
+                {'type': 'post', 'author': 'StasBasov', 'text': 'Текст',
+                 'pub_date': 'вчера'},
+                {'type': 'post', 'author': 'StasBasov', 'text': 'Текст'},
+                {'type': 'post', 'author': 'StasBasov', 'text': 'Текст',
+                 'pub_date': '2019-13-01T10:00:00'},
+                {'type': 'post', 'author': 'StasBasov', 'text': 'Текст',
+                 'group': ['test-slug']},
+                {'type': 'post', 'author': 'StasBasov', 'text': 'Текст',
+                 'group': {'slug': 'test-slug'}},
+            ),
+        ])
+        self.assertEqual(stats.lines, 10)
+        self.assertEqual(stats.skipped, 8)
+        self.assertEqual(stats.posts, 1)
+        self.assertEqual(
+            [error.split(':')[0] for error in stats.errors],
+            ['строка 1', 'строка 9', 'строка 10', 'строка 3', 'строка 4',
+             'строка 6', 'строка 8', 'строка 5'],
+        )
+
+    def test_command(self):
+        """Команда импортирует файл и сообщает скорость"""
+        with tempfile.NamedTemporaryFile('wb', delete=False) as file:
+            file.write(b'\n'.join(self.records))
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command('import_posts', file.name, stdout=out)
+        output = out.getvalue()
+        self.assertIn('Импортировано постов: 2, комментариев: 1', output)
+        self.assertIn('строк/с', output)
+
+    def test_endpoint_requires_staff(self):
+        """Импорт через API доступен только сотрудникам"""
+        url = reverse('api:import')
+        body = b'\n'.join(self.records)
+        client = Client()
+
+        def post():
+            return client.post(
+                url, body, content_type='application/x-ndjson'
+            )
+
+        self.assertEqual(post().status_code, 401)
+        client.force_login(self.follower)
+        self.assertEqual(post().status_code, 403)
+        self.assertFalse(Post.objects.exists())
+
+        self.follower.is_staff = True
+        self.follower.save()
+        response = post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['posts'], 2)
+        self.assertEqual(Post.objects.count(), 2)
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+
+class QueryPlanTests(TestCase):
+    """Запросы лент используют индексы и не сортируют во временном B-tree.
+
+    Проверка опирается на EXPLAIN QUERY PLAN и имеет смысл только в SQLite.
+    """
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN есть только в SQLite')
+
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.follower = get_user_model().objects.create(username='Nikita')
+        self.follower.follower.create(author=self.user)
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+        self.guest_client = Client()
+
+        self.group = Group.objects.create(
+            title='Заголовок группы',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        self.post = Post.objects.create(
+            text='Текст поста',
+            group=self.group,
+            author=self.user,
+        )
+        self.post.comments.create(author=self.follower, text='Комментарий')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return ' | '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def ordered_queries(self, client, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url, {'cursor': ''})
+        return [
+            query['sql'] for query in queries
+            if f'FROM "{table}"' in query['sql'] and 'ORDER BY' in query['sql']
+        ]
+
+    def test_feed_queries_use_indexes(self):
+        """Каждая лента читается по индексу без сортировки TEMP B-TREE."""
+        views = (
+            (self.guest_client, reverse('index'), 'posts_post'),
+            (self.guest_client, reverse('group', args=[self.group.slug]),
+             'posts_post'),
+            (self.guest_client, reverse('profile', args=[self.user.username]),
+             'posts_post'),
+            (self.follower_client, reverse('follow_index'), 'posts_post'),
+            (self.guest_client,
+             reverse('post', args=[self.user.username, self.post.id]),
+             'posts_comment'),
+        )
+        for client, url, table in views:
+            with self.subTest(url=url):
+                queries = self.ordered_queries(client, url, table)
+                self.assertTrue(queries)
+                for sql in queries:
+                    plan = self.explain(sql)
+                    self.assertIn('INDEX', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,64 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.post = Post.objects.create(text='Текст поста', author=self.user)
+
+    def get_logged(self, url):
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            response = self.guest_client.get(url)
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        return response, record, json.loads(record.getMessage())
+
+    @override_settings(REQUEST_SERVER_TIMING=True)
+    def test_server_timing_and_log(self):
+        """Ответ содержит Server-Timing, а лог — метрики запроса"""
+        response, _, record = self.get_logged(reverse('index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+        self.assertEqual(record['view'], 'index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+        self.assertFalse(record['over_budget'])
+
+        _, _, record = self.get_logged(reverse('index'))
+        self.assertGreater(record['cache_hits'], 0)
+        self.assertEqual(record['template_ms'], 0)
+
+    def test_server_timing_only_for_staff(self):
+        """Без DEBUG Server-Timing видят только сотрудники"""
+        url = reverse('index')
+        response, _, _ = self.get_logged(url)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+        client = Client()
+        client.force_login(self.user)
+        self.assertFalse(client.get(url).has_header('Server-Timing'))
+        self.user.is_staff = True
+        self.user.save()
+        self.assertTrue(client.get(url).has_header('Server-Timing'))
+
+    @override_settings(REQUEST_QUERY_BUDGETS={'index': 0})
+    def test_over_budget_is_warning(self):
+        """Превышение бюджета запросов логируется предупреждением"""
+        _, log_record, record = self.get_logged(reverse('index'))
+        self.assertEqual(log_record.levelname, 'WARNING')
+        self.assertTrue(record['over_budget'])
+        self.assertEqual(record['query_budget'], 0)
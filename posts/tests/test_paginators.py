@@ -0,0 +1,160 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.constants import POSTS_PER_PAGE
+from posts.models import Group, Post
+from posts.paginators import elided_page_range
+
+
+class CursorPaginatorTests(TestCase):
+
+    def setUp(self):
+        self.guest_client = Client()
+
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.follower = get_user_model().objects.create(username='Nikita')
+        self.follower.follower.create(author=self.user)
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+        self.group = Group.objects.create(
+            title='Заголовок группы',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        for i in range(POSTS_PER_PAGE * 2 + 3):
+            Post.objects.create(
+                text=f'Текст поста {i}',
+                group=self.group,
+                author=self.user,
+            )
+
+        self.feed_urls = (
+            (self.guest_client, reverse('index')),
+            (self.guest_client,
+             reverse('group', kwargs={'slug': self.group.slug})),
+            (self.guest_client,
+             reverse('profile', kwargs={'username': self.user.username})),
+            (self.follower_client, reverse('follow_index')),
+        )
+
+    def walk_forward(self, client, url):
+        pages = []
+        response = client.get(url)
+        pages.append(list(response.context.get('page')))
+        while response.context.get('page').next_cursor:
+            cursor = response.context.get('page').next_cursor
+            response = client.get(url, {'cursor': cursor})
+            pages.append(list(response.context.get('page')))
+        return pages, response
+
+    def test_cursor_pages_cover_whole_feed(self):
+        """Переходы по курсорам выдают все посты по одному разу и по порядку."""
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        for client, url in self.feed_urls:
+            with self.subTest(url=url):
+                pages, _ = self.walk_forward(client, url)
+                self.assertEqual(
+                    [len(page) for page in pages],
+                    [POSTS_PER_PAGE, POSTS_PER_PAGE, 3]
+                )
+                self.assertEqual(sum(pages, []), expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор «назад» возвращает предыдущую страницу."""
+        for client, url in self.feed_urls:
+            with self.subTest(url=url):
+                pages, response = self.walk_forward(client, url)
+                page = response.context.get('page')
+                self.assertFalse(page.has_next())
+                response = client.get(
+                    url, {'cursor': page.previous_cursor}
+                )
+                self.assertEqual(
+                    list(response.context.get('page')), pages[-2]
+                )
+
+    def test_cursor_page_does_not_count_rows(self):
+        """Страница по курсору выбирается без COUNT(*) и OFFSET."""
+        response = self.guest_client.get(reverse('index'))
+        cursor = response.context.get('page').next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('index'), {'cursor': cursor})
+        for query in queries:
+            self.assertNotIn('COUNT(*)', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
+        first_page = list(
+            Post.objects.order_by('-pub_date', '-pk')[:POSTS_PER_PAGE]
+        )
+        cursors = ['not-a-cursor'] + [
+            base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            for payload in (
+                {'v': ['x', 1], 'r': False},
+                {'v': ['2020-01-01T00:00:00', 'abc'], 'r': False},
+                {'v': 1, 'r': False},
+                ['2020-01-01T00:00:00', 1],
+            )
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('index'), {'cursor': cursor}
+                )
+                self.assertEqual(
+                    list(response.context.get('page')), first_page
+                )
+                response = self.guest_client.get(
+                    reverse('api:posts'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+
+
+class PageRangeTests(SimpleTestCase):
+
+    def page_range(self, count, number):
+        page = Paginator(range(count), POSTS_PER_PAGE).page(number)
+        return elided_page_range(page)
+
+    def test_short_range_is_not_elided(self):
+        """Пока страниц немного, выводятся все номера"""
+        self.assertEqual(self.page_range(100, 5), list(range(1, 11)))
+
+    def test_long_range_is_elided(self):
+        """Длинный список сокращается до краёв и соседей текущей"""
+        self.assertEqual(
+            self.page_range(10000, 500),
+            [1, 2, None, 497, 498, 499, 500, 501, 502, 503, None, 999, 1000],
+        )
+        self.assertEqual(
+            self.page_range(10000, 3),
+            [1, 2, 3, 4, 5, 6, None, 999, 1000],
+        )
+        self.assertEqual(
+            self.page_range(10000, 999),
+            [1, 2, None, 996, 997, 998, 999, 1000],
+        )
+
+    def test_paginator_html_does_not_depend_on_post_count(self):
+        """Размер навигации не растёт с числом постов"""
+        sizes = []
+        for count in (1000, 500000):
+            paginator = Paginator(range(count), POSTS_PER_PAGE)
+            page = paginator.page(paginator.num_pages // 2)
+            html = render_to_string('includes/paginator.html', {
+                'page': page, 'paginator': paginator,
+            })
+            self.assertLessEqual(html.count('<li'), 15)
+            sizes.append(len(html))
+        self.assertLess(sizes[1], 4096)
+        # Разница только в числе цифр в номерах страниц.
+        self.assertLess(sizes[1] - sizes[0], 100)
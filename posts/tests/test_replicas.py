@@ -0,0 +1,61 @@
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+from yatube.db import PIN_COOKIE, ReplicaRoutingMiddleware
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica1'], DATABASE_REPLICA_PIN_SECONDS=10
+)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Решения роутера проверяются без запросов к БД."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def handle(self, request, write=False):
+        """Пропустить запрос через middleware и вернуть базы чтения."""
+        reads = []
+
+        def view(request):
+            reads.append(router.db_for_read(Post))
+            if write:
+                router.db_for_write(Post)
+                reads.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return response, reads
+
+    def test_reads_go_to_replica(self):
+        """GET читает из реплики, вне запроса — из основной базы"""
+        response, reads = self.handle(self.factory.get('/'))
+        self.assertEqual(reads, ['replica1'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_write_pins_client_to_primary(self):
+        """После записи запрос и следующие запросы читают из основной"""
+        response, reads = self.handle(self.factory.get('/'), write=True)
+        self.assertEqual(reads, ['replica1', 'default'])
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        _, reads = self.handle(request)
+        self.assertEqual(reads, ['default'])
+
+    def test_unsafe_methods_use_primary(self):
+        """POST читает из основной базы"""
+        _, reads = self.handle(self.factory.post('/'))
+        self.assertEqual(reads, ['default'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё идёт в основную базу и cookie не ставится"""
+        response, reads = self.handle(self.factory.get('/'), write=True)
+        self.assertEqual(reads, ['default', 'default'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
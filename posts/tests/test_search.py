@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.group = Group.objects.create(
+            title='Кулинария',
+            slug='cooking',
+            description='Рецепты и советы',
+        )
+        self.post = Post.objects.create(
+            text='Пеку пироги с капустой',
+            author=self.user,
+            group=self.group,
+        )
+        self.other = Post.objects.create(
+            text='Пироги, пироги и ещё раз пироги',
+            author=get_user_model().objects.create(username='Nikita'),
+        )
+
+    def found(self, query):
+        return list(search.search_posts(query).order_by(
+            *search.SEARCH_ORDERING
+        ))
+
+    def test_search_by_text_group_and_author(self):
+        """Поиск находит посты по тексту, группе и имени автора"""
+        self.assertEqual(self.found('капустой'), [self.post])
+        self.assertEqual(self.found('кулинария'), [self.post])
+        self.assertEqual(self.found('stasbasov'), [self.post])
+        self.assertEqual(self.found('пироги nikita'), [self.other])
+        self.assertEqual(self.found('   '), [])
+
+    def test_results_are_ranked(self):
+        """Пост с большим числом совпадений идёт первым"""
+        self.assertEqual(self.found('пироги'), [self.other, self.post])
+
+    def test_index_follows_changes(self):
+        """Сигналы обновляют индекс при правке и удалении"""
+        self.post.text = 'Варю борщ'
+        self.post.save()
+        self.assertEqual(self.found('борщ'), [self.post])
+        self.assertEqual(self.found('капустой'), [])
+
+        self.group.title = 'Выпечка'
+        self.group.save()
+        self.assertEqual(self.found('выпечка'), [self.post])
+
+        self.user.username = 'Chef'
+        self.user.save()
+        self.assertEqual(self.found('chef'), [self.post])
+
+        self.group.delete()
+        self.assertEqual(self.found('выпечка'), [])
+
+        self.other.delete()
+        self.assertEqual(self.found('пироги'), [])
+
+    def test_rebuild(self):
+        """Посты, созданные в обход сигналов, попадают в индекс"""
+        Post.objects.bulk_create([
+            Post(text='Массовая загрузка', author=self.user),
+        ])
+        self.assertEqual(self.found('загрузка'), [])
+        self.assertEqual(search.rebuild(), 3)
+        self.assertEqual(len(self.found('загрузка')), 1)
+
+    def test_search_page_uses_cursor(self):
+        """Страница поиска листается курсорами без COUNT(*)"""
+        Post.objects.bulk_create(
+            Post(text=f'Пироги номер {i}', author=self.user)
+            for i in range(12)
+        )
+        search.rebuild()
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                reverse('search'), {'q': 'пироги'}
+            )
+        page = response.context['page']
+        self.assertEqual(len(page), 10)
+        self.assertContains(response, 'q=%D0%BF%D0%B8%D1%80%D0%BE%D0%B3%D0%B8')
+
+        response = self.guest_client.get(
+            reverse('search'), {'q': 'пироги', 'cursor': page.next_cursor}
+        )
+        rest = response.context['page']
+        self.assertEqual(len(rest), 4)
+        self.assertFalse(set(page) & set(rest))
@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POST_THUMBNAILS_ASYNC=False)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = get_user_model().objects.create(username='StasBasov')
+
+        content = BytesIO()
+        Image.new('RGB', (700, 400), color=(255, 0, 0)).save(content, 'PNG')
+        self.post = Post.objects.create(
+            text='Текст поста',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name='small.png',
+                content=content.getvalue(),
+                content_type='image/png',
+            ),
+        )
+
+    def test_card_shows_placeholder_until_thumbnail_ready(self):
+        """Карточка не ждёт миниатюру: сначала заглушка, потом картинка"""
+        name = thumbnails.thumbnail_name(self.post.image.name)
+        response = self.guest_client.get(reverse('index'))
+        self.assertNotContains(response, name)
+        self.assertContains(response, 'bg-light')
+
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, default_storage.url(name))
+
+    def test_thumbnail_is_cropped_to_card_size(self):
+        """Миниатюра кадрируется и увеличивается до размера карточки"""
+        manifest = thumbnails.generate(self.post.image.name)
+        with default_storage.open(manifest['fallback']) as thumbnail:
+            self.assertEqual(
+                Image.open(thumbnail).size, thumbnails.CARD_SIZE
+            )
+
+    def test_variants_are_not_wider_than_source(self):
+        """Варианты строятся по ширинам, не превышающим исходник"""
+        manifest = thumbnails.generate(self.post.image.name)
+        for fmt in thumbnails.supported_formats():
+            with self.subTest(fmt=fmt):
+                variants = manifest['variants'][fmt]
+                self.assertEqual(
+                    [width for width, _ in variants], [320, 640]
+                )
+                for width, name in variants:
+                    with default_storage.open(name) as variant:
+                        image = Image.open(variant)
+                        self.assertEqual(image.format, fmt)
+                        self.assertEqual(
+                            image.size, thumbnails.variant_size(width)
+                        )
+
+    def test_card_renders_srcset(self):
+        """Карточка отдаёт варианты через srcset"""
+        thumbnails.generate(self.post.image.name)
+        response = self.guest_client.get(reverse('index'))
+        for fmt in thumbnails.supported_formats():
+            with self.subTest(fmt=fmt):
+                name = thumbnails.variant_name(
+                    self.post.image.name, 640, fmt
+                )
+                self.assertContains(
+                    response, default_storage.url(name) + ' 640w'
+                )
+
+    def test_broken_image_is_not_retried_on_every_render(self):
+        """Ошибка подготовки не повторяется на каждом рендеринге"""
+        Post.objects.filter(pk=self.post.pk).update(image='posts/missing.jpg')
+        self.post.refresh_from_db()
+        with self.assertLogs('posts.thumbnails', 'WARNING') as logs:
+            self.assertIsNone(thumbnails.card_image(self.post.image))
+            self.assertIsNone(thumbnails.card_image(self.post.image))
+        self.assertEqual(len(logs.output), 1)
@@ -135,3 +135,17 @@ class PostURLTests(TestCase):
         """Возвращает ли сервер код 404 для несущ. страниц"""
         response = self.guest_client.get('/404/')
         self.assertEqual(response.status_code, 404)
+
+    def test_search_does_not_shadow_profile(self):
+        """Пользователь search не теряет профиль из-за поиска"""
+        user = get_user_model().objects.create(username='search')
+        post = Post.objects.create(text='Текст поста', author=user)
+        for url, template in (
+            (reverse('profile', args=['search']), 'profile.html'),
+            (reverse('post', args=['search', post.pk]), 'post.html'),
+            (reverse('search'), 'search.html'),
+        ):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTemplateUsed(response, template)
@@ -2,16 +2,22 @@ import shutil
 import tempfile
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.forms import fields
-from django.test import Client, TestCase
+from django.template import Context, engines
+from django.template.loaders import cached
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.constants import POSTS_PER_PAGE
 from posts.models import Group, Post
 
 
+@override_settings(POST_THUMBNAILS_ASYNC=False)
 class PostPagesTests(TestCase):
 
     @classmethod
@@ -172,6 +178,32 @@ class PostPagesTests(TestCase):
         self.assertEqual(response.context.get('post'), self.post)
         self.assertTrue(response.context.get('post_viewing'))
 
+    def test_post_cards_match_include(self):
+        """post_cards отдаёт те же карточки, что include в цикле"""
+        Post.objects.create(text='Второй пост', author=self.user)
+        engine = engines.all()[0].engine
+        context = {
+            'posts': list(Post.objects.for_feed()), 'user': self.user,
+        }
+        loop = engine.from_string(
+            '{% for post in posts %}'
+            '{% include "includes/post_item.html" with post=post %}'
+            '{% endfor %}'
+        )
+        # Первая отрисовка готовит миниатюры изображения.
+        loop.render(Context(context))
+        expected = loop.render(Context(context))
+        cards = engine.from_string(
+            '{% load post_cards %}{% post_cards posts %}'
+        ).render(Context(context))
+        self.assertEqual(cards, expected)
+        self.assertEqual(cards.count('Редактировать'), 2)
+
+    def test_templates_are_cached(self):
+        """Скомпилированные шаблоны кешируются и при DEBUG=True"""
+        loader, = engines.all()[0].engine.template_loaders
+        self.assertIsInstance(loader, cached.Loader)
+
 
 class PaginatorPostTests(TestCase):
 
@@ -218,3 +250,59 @@ class PaginatorPostTests(TestCase):
                     len(response.context.get('page').object_list),
                     3
                 )
+
+
+class FeedQueriesTests(TestCase):
+
+    def setUp(self):
+        self.guest_client = Client()
+
+        self.user = get_user_model().objects.create(username='StasBasov')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+        self.group = Group.objects.create(
+            title='Заголовок группы',
+            slug='test-slug',
+            description='Описание группы'
+        )
+        self.follower = get_user_model().objects.create(username='Nikita')
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+        self.follower.follower.create(author=self.user)
+
+        self.feed_urls = (
+            (self.guest_client, reverse('index')),
+            (self.guest_client, reverse('group', args=[self.group.slug])),
+            (self.guest_client, reverse('profile', args=[self.user.username])),
+            (self.follower_client, reverse('follow_index')),
+        )
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Текст поста {i}',
+                group=self.group,
+                author=self.user,
+            )
+            post.comments.create(author=self.follower, text='Комментарий')
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        return len(queries)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от количества постов."""
+        self.create_posts(1)
+        one_post = {
+            url: self.count_queries(client, url)
+            for client, url in self.feed_urls
+        }
+        self.create_posts(POSTS_PER_PAGE)
+        for client, url in self.feed_urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.count_queries(client, url), one_post[url]
+                )
@@ -0,0 +1,209 @@
+"""Фоновая подготовка изображений для карточек постов.
+
+Изображения не считаются во время запроса: view ставит задачу в пул
+потоков после сохранения поста, а шаблон показывает заглушку, пока
+файлы не готовы. Для карточки готовится набор вариантов по ширине в
+WebP и AVIF (если Pillow их поддерживает) и JPEG для старых браузеров;
+шаблон отдаёт их через srcset, и браузер выбирает подходящий размер.
+
+Список готовых файлов хранится в кеше, поэтому карточка не делает
+ни запросов к БД, ни декодирования изображения. Когда варианты
+готовы, поколения лент поста увеличиваются, чтобы закешированные
+страницы с заглушкой обновились.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import cache as feed_cache
+
+logger = logging.getLogger(__name__)
+
+CARD_SIZE = (960, 339)
+VARIANT_WIDTHS = (320, 640, 960, 1920)
+FALLBACK_FORMAT = 'JPEG'
+MODERN_FORMATS = ('AVIF', 'WEBP')
+FORMATS = {
+    'AVIF': ('avif', 'image/avif', {'quality': 60}),
+    'WEBP': ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('jpg', 'image/jpeg', {
+        'quality': 85, 'optimize': True, 'progressive': True,
+    }),
+}
+FAILED = 'failed'
+FAILED_RETRY_TIMEOUT = 60 * 5
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def supported_formats():
+    Image.init()
+    return [fmt for fmt in MODERN_FORMATS if fmt in Image.SAVE]
+
+
+def variant_size(width):
+    return width, round(width * CARD_SIZE[1] / CARD_SIZE[0])
+
+
+def variant_name(image_name, width, fmt=FALLBACK_FORMAT):
+    digest = hashlib.md5(image_name.encode()).hexdigest()
+    return 'thumbs/{}/{}_{}x{}.{}'.format(
+        digest[:2], digest, *variant_size(width), FORMATS[fmt][0]
+    )
+
+
+def thumbnail_name(image_name):
+    """Имя JPEG-миниатюры карточки, запасного варианта для srcset."""
+    return variant_name(image_name, CARD_SIZE[0])
+
+
+def _state_key(image_name):
+    return 'card_image:{}'.format(thumbnail_name(image_name))
+
+
+def _save(name, image, fmt):
+    content = BytesIO()
+    image.save(content, fmt, **FORMATS[fmt][2])
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content.getvalue()))
+
+
+def generate(image_name, feeds=()):
+    """Построить варианты карточки: кадрирование по центру.
+
+    Возвращает описание готовых файлов: имя JPEG-миниатюры и списки
+    (ширина, имя) для каждого современного формата. Варианты шире
+    исходника не строятся, JPEG на ширину карточки — всегда.
+    """
+    try:
+        with default_storage.open(image_name) as source:
+            image = Image.open(source)
+            image.load()
+        image = image.convert('RGB')
+        fallback = thumbnail_name(image_name)
+        _save(fallback, ImageOps.fit(image, CARD_SIZE, Image.LANCZOS), 'JPEG')
+        widths = [
+            width for width in VARIANT_WIDTHS if width <= image.width
+        ] or [VARIANT_WIDTHS[0]]
+        variants = {}
+        for fmt in supported_formats():
+            variants[fmt] = []
+            for width in widths:
+                name = variant_name(image_name, width, fmt)
+                _save(
+                    name,
+                    ImageOps.fit(image, variant_size(width), Image.LANCZOS),
+                    fmt,
+                )
+                variants[fmt].append((width, name))
+    except Exception:
+        logger.warning(
+            'Не удалось подготовить изображения для %s', image_name,
+            exc_info=True,
+        )
+        cache.set(_state_key(image_name), FAILED, FAILED_RETRY_TIMEOUT)
+        return None
+    manifest = {'fallback': fallback, 'variants': variants}
+    cache.set(_state_key(image_name), manifest, None)
+    feed_cache.bump_feeds(*feeds)
+    return manifest
+
+
+def _manifest_from_storage(image_name):
+    """Восстановить описание готовых файлов, если кеш его потерял."""
+    fallback = thumbnail_name(image_name)
+    if not default_storage.exists(fallback):
+        return None
+    variants = {}
+    for fmt in supported_formats():
+        variants[fmt] = [
+            (width, variant_name(image_name, width, fmt))
+            for width in VARIANT_WIDTHS
+            if default_storage.exists(variant_name(image_name, width, fmt))
+        ]
+    return {'fallback': fallback, 'variants': variants}
+
+
+def _run(image_name, feeds):
+    try:
+        generate(image_name, feeds)
+    finally:
+        with _lock:
+            _pending.discard(image_name)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'POST_THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def schedule(image_name, feeds=()):
+    """Поставить изображение в очередь, если оно ещё не в работе."""
+    if not getattr(settings, 'POST_THUMBNAILS_ASYNC', True):
+        generate(image_name, feeds)
+        return
+    with _lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    _get_executor().submit(_run, image_name, feeds)
+
+
+def schedule_for_post(post):
+    """Подготовить изображения поста после фиксации транзакции."""
+    if post.image:
+        image_name = post.image.name
+        feeds = feed_cache.post_feeds(post)
+        transaction.on_commit(lambda: schedule(image_name, feeds))
+
+
+def card_image(image):
+    """URL изображений карточки или None, пока они готовятся.
+
+    Возвращает словарь с ключами src (JPEG) и sources — списком
+    словарей type/srcset для элементов <source>.
+    """
+    if not image:
+        return None
+    state_key = _state_key(image.name)
+    manifest = cache.get(state_key)
+    if manifest is None:
+        manifest = _manifest_from_storage(image.name)
+        if manifest is not None:
+            cache.set(state_key, manifest, None)
+    if manifest is None:
+        schedule(image.name, feed_cache.post_feeds(image.instance))
+        return None
+    if manifest == FAILED:
+        return None
+    return {
+        'src': default_storage.url(manifest['fallback']),
+        'sources': [
+            {
+                'type': FORMATS[fmt][1],
+                'srcset': ', '.join(
+                    '{} {}w'.format(default_storage.url(name), width)
+                    for width, name in variants
+                ),
+            }
+            for fmt, variants in manifest['variants'].items() if variants
+        ],
+    }
@@ -0,0 +1,107 @@
+"""Материализованная лента подписок.
+
+Для каждого подписчика хранится по записи TimelineEntry на каждый пост
+авторов, на которых он подписан. Записи раскладываются при публикации
+поста и при подписке, поэтому страница /follow/ читается диапазоном по
+индексу (user, pub_date) без соединения Post с Follow.
+"""
+from django.db import connection
+from django.db.models import F
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+TIMELINE_ORDERING = ('-timeline_date', '-timeline_post')
+
+
+def _bulk_create(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Добавить новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_create(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def _copy_posts(follows, **posts):
+    """Разложить посты авторов по лентам подписчиков.
+
+    Записи вставляются одним INSERT ... SELECT по соединению подписок с
+    постами, без выборки строк в Python; уже существующие пропускаются.
+    posts — необязательные условия на посты (``pk__in=...``); они
+    задаются в том же filter(), чтобы относиться к тому же соединению.
+    """
+    rows = follows.order_by().filter(
+        author__author_post__isnull=False,
+        **{
+            f'author__author_post__{lookup}': value
+            for lookup, value in posts.items()
+        },
+    ).values_list(
+        'user_id', 'author__author_post__id', 'author__author_post__pub_date'
+    )
+    select, params = rows.query.sql_with_params()
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '{} {} (user_id, post_id, pub_date) {} {}'.format(
+                ops.insert_statement(ignore_conflicts=True),
+                ops.quote_name(TimelineEntry._meta.db_table),
+                select,
+                ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+            ),
+            params,
+        )
+
+
+def add_author(user_id, author_id):
+    """Дописать в ленту подписчика все посты нового автора."""
+    _copy_posts(Follow.objects.filter(user_id=user_id, author_id=author_id))
+
+
+def fan_out_posts(post_ids):
+    """Добавить посты, созданные в обход сигналов, в ленты подписчиков."""
+    if post_ids:
+        _copy_posts(Follow.objects.all(), pk__in=post_ids)
+
+
+def remove_author(user_id, author_id):
+    """Убрать из ленты подписчика посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(users=None):
+    """Пересобрать ленты пользователей (всех, если users не задан).
+
+    Возвращает число созданных записей.
+    """
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.order_by()
+    if users is not None:
+        entries = entries.filter(user__in=users)
+        follows = follows.filter(user__in=users)
+    entries.delete()
+    _copy_posts(follows)
+    return TimelineEntry.objects.filter(
+        user__in=follows.values('user_id')
+    ).count()
+
+
+def timeline_posts(user):
+    """Посты ленты подписок в порядке записей TimelineEntry."""
+    return Post.objects.for_feed().filter(
+        timeline_entries__user=user
+    ).annotate(
+        timeline_date=F('timeline_entries__pub_date'),
+        timeline_post=F('timeline_entries__post'),
+    )
@@ -0,0 +1,158 @@
+"""Приём изображений постов.
+
+LimitedUploadHandler пишет загрузку сразу на диск и обрывает её, как
+только размер превышает POST_IMAGE_MAX_SIZE: по заголовку
+Content-Length — ещё до чтения файла, иначе — по мере приёма данных.
+Причина отказа сохраняется в request.upload_errors и показывается
+формой.
+
+sanitize_image() перекодирует принятое изображение без EXIF в пуле
+из POST_IMAGE_ENCODERS потоков, поэтому одновременно декодируется не
+больше заданного числа картинок и память воркера не растёт с числом
+параллельных загрузок.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import (
+    SkipFile, StopUpload, TemporaryFileUploadHandler,
+)
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Запас на остальные поля формы и разметку multipart.
+FORM_OVERHEAD = 64 * 1024
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'GIF': {},
+    'WEBP': {'quality': 90},
+}
+# Остальные форматы (TIFF, BMP, ...) сохраняются в PNG.
+FALLBACK_FORMAT = 'PNG'
+FALLBACK_EXTENSION = '.png'
+PNG_MODES = ('1', 'L', 'LA', 'I', 'P', 'RGB', 'RGBA')
+
+_executor = None
+_lock = threading.Lock()
+
+
+def max_upload_size():
+    return settings.POST_IMAGE_MAX_SIZE
+
+
+def size_error():
+    return 'Размер файла не должен превышать {}.'.format(
+        filesizeformat(max_upload_size())
+    )
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Потоковая запись загрузки на диск с ограничением размера."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.too_large = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        self.too_large = (
+            content_length > max_upload_size() + FORM_OVERHEAD
+        )
+
+    def reject(self, field_name):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_errors'):
+                self.request.upload_errors = {}
+            self.request.upload_errors[field_name] = size_error()
+
+    def new_file(self, field_name, *args, **kwargs):
+        if self.too_large:
+            self.reject(field_name)
+            raise StopUpload(connection_reset=True)
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > max_upload_size():
+            self.file.close()
+            self.reject(self.field_name)
+            raise SkipFile()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def _png_compatible(image):
+    if image.mode in PNG_MODES:
+        return image
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _reencode(uploaded):
+    uploaded.seek(0)
+    name = uploaded.name
+    with Image.open(uploaded) as image:
+        fmt = image.format
+        options = dict(SAVE_OPTIONS.get(fmt, {}))
+        if image.info.get('icc_profile'):
+            options['icc_profile'] = image.info['icc_profile']
+        if fmt in SAVE_OPTIONS and getattr(image, 'is_animated', False):
+            options['save_all'] = True
+        else:
+            image = ImageOps.exif_transpose(image)
+        if fmt not in SAVE_OPTIONS:
+            # Сохраняется только первый кадр, в режиме, который понимает
+            # PNG (CMYK из TIFF, например, не понимает).
+            fmt = FALLBACK_FORMAT
+            options.update(SAVE_OPTIONS[fmt])
+            converted = _png_compatible(image)
+            if converted is not image:
+                # Профиль исходного цветового пространства к новому
+                # режиму не подходит.
+                options.pop('icc_profile', None)
+            image = converted
+            name = os.path.splitext(name)[0] + FALLBACK_EXTENSION
+        content = BytesIO()
+        # EXIF в параметры сохранения не передаётся и в файл не попадает.
+        image.save(content, fmt, **options)
+    return SimpleUploadedFile(
+        name,
+        content.getvalue(),
+        Image.MIME.get(fmt, uploaded.content_type),
+    )
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POST_IMAGE_ENCODERS,
+                thread_name_prefix='image-encoders',
+            )
+        return _executor
+
+
+def sanitize_image(uploaded):
+    """Перекодировать изображение без метаданных в ограниченном пуле.
+
+    Исходный временный файл закрывается (и удаляется) сразу после
+    перекодирования.
+    """
+    try:
+        return _get_executor().submit(_reencode, uploaded).result()
+    except OSError as error:
+        # Pillow сообщает о файле, который не смог прочитать или
+        # записать, через OSError.
+        raise ValidationError(
+            'Не удалось обработать изображение.', code='invalid_image'
+        ) from error
+    finally:
+        uploaded.close()
@@ -7,8 +7,17 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    # Один сегмент пути занят профилями: адрес search/ отнял бы профиль у
+    # пользователя search, а search/posts/ ни с одним маршрутом профиля
+    # не совпадает.
+    path('search/posts/', views.search_posts, name='search'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         '<str:username>/<int:post_id>/edit/',
         views.post_edit,
@@ -1,34 +1,35 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404, redirect
 
-from .constants import POSTS_PER_PAGE
+from . import cache as feed_cache
+from . import counters, search, thumbnails, timeline
+from .constants import COMMENTS_PER_PAGE, POSTS_PER_PAGE
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .paginators import COMMENT_ORDERINGS, CursorPaginator, paginate
+from .serializers import json_response, serialize_comment
 
 
+@feed_cache.anonymous_page_cache(feed_cache.index_scope)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-
-    page_number = request.GET.get('page')
-
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    paginator, page = paginate(request, post_list)
     return render(
         request,
         'index.html',
-        {'page': page, 'paginator': paginator}
+        {
+            'page': page,
+            'paginator': paginator,
+            'feed_version': feed_cache.feed_version(feed_cache.INDEX_FEED),
+        }
     )
 
 
+@feed_cache.anonymous_page_cache(feed_cache.group_scope)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.group_post.all()
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-
-    page_number = request.GET.get('page')
-
-    page = paginator.get_page(page_number)
+    post_list = group.group_post.for_feed()
+    paginator, page = paginate(request, post_list)
     return render(
         request,
         'group.html',
@@ -36,11 +37,26 @@ def group_posts(request, slug):
     )
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    # Только курсоры: COUNT(*) по совпадениям на больших выборках дорог.
+    paginator = CursorPaginator(
+        search.search_posts(query), POSTS_PER_PAGE, search.SEARCH_ORDERING
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    return render(
+        request,
+        'search.html',
+        {'query': query, 'page': page, 'paginator': paginator}
+    )
+
+
 @login_required
 def new_post(request):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
+        upload_errors=getattr(request, 'upload_errors', None),
         )
 
     if request.method == 'GET' or not form.is_valid():
@@ -49,25 +65,24 @@ def new_post(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    thumbnails.schedule_for_post(post)
     return redirect('index')
 
 
+@feed_cache.anonymous_page_cache(feed_cache.profile_scope)
 def profile(request, username):
-    author_profile = get_object_or_404(User, username=username)
-    post_list = author_profile.author_post.all()
+    author_profile = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author_profile.author_post.for_feed()
 
     follow_user = (request.user.is_authenticated
                    and author_profile != request.user
                    and author_profile.following.filter(user=request.user))
 
-    subscriptions = author_profile.follower.count()
-    subscribers = author_profile.following.count()
-
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-
-    page_number = request.GET.get('page')
+    stats = counters.author_stats(author_profile)
 
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(request, post_list)
     return render(
         request,
         'profile.html',
@@ -75,38 +90,84 @@ def profile(request, username):
             'author_profile': author_profile,
             'page': page,
             'paginator': paginator,
+            'author_posts_count': stats.posts_count,
             'following': follow_user,
-            'subscriptions': subscriptions,
-            'subscribers': subscribers,
+            'subscriptions': stats.following_count,
+            'subscribers': stats.followers_count,
         }
     )
 
 
+@feed_cache.anonymous_page_cache(feed_cache.post_scope)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id, author__username=username)
-    author_posts_count = post.author.author_post.count()
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__stats'),
+        pk=post_id,
+        author__username=username,
+    )
 
     follow_user = (request.user.is_authenticated
                    and post.author != request.user
                    and post.author.following.filter(user=request.user))
 
-    subscriptions = post.author.follower.count()
-    subscribers = post.author.following.count()
+    stats = counters.author_stats(post.author)
 
     form = CommentForm()
-    comments = post.comments.all()
+    order = comment_order(request)
+    comments, next_cursor = comment_paginator(post, order).first_page(
+        post.comments_count
+    )
     return render(
         request, 'post.html',
         {
             'author_profile': post.author,
-            'author_posts_count': author_posts_count,
+            'author_posts_count': stats.posts_count,
             'post': post,
             'form': form,
             'comments': comments,
+            'comments_order': order,
+            'comments_next_cursor': next_cursor,
             'post_viewing': True,
             'following': follow_user,
-            'subscriptions': subscriptions,
-            'subscribers': subscribers,
+            'subscriptions': stats.following_count,
+            'subscribers': stats.followers_count,
+        }
+    )
+
+
+def comment_order(request):
+    order = request.GET.get('comments')
+    return order if order in COMMENT_ORDERINGS else 'oldest'
+
+
+def comment_paginator(post, order):
+    return CursorPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        COMMENT_ORDERINGS[order],
+    )
+
+
+@feed_cache.anonymous_page_cache(feed_cache.post_scope)
+def post_comments(request, username, post_id):
+    """Следующая порция комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post, pk=post_id, author__username=username)
+    order = comment_order(request)
+    page = comment_paginator(post, order).get_page(request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return json_response({
+            'comments': [serialize_comment(comment) for comment in page],
+            'next_cursor': page.next_cursor,
+        })
+    return render(
+        request,
+        'includes/comment_list.html',
+        {
+            'post': post,
+            'username': username,
+            'comments': page,
+            'comments_order': order,
+            'comments_next_cursor': page.next_cursor,
         }
     )
 
@@ -120,9 +181,12 @@ def post_edit(request, username, post_id):
         request.POST or None,
         files=request.FILES or None,
         instance=post,
+        upload_errors=getattr(request, 'upload_errors', None),
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule_for_post(post)
         return redirect('post', username, post_id)
 
     return render(
@@ -146,10 +210,10 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = timeline.timeline_posts(request.user)
+    paginator, page = paginate(
+        request, post_list, ordering=timeline.TIMELINE_ORDERING
+    )
     return render(
         request,
         'follow.html',
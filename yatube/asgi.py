@@ -0,0 +1,28 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI handler (it appeared in Django 3.0, async views in
+3.1), so until the project is upgraded this module fails loudly on import
+instead of letting an ASGI server start with a broken application. Serve
+the project with yatube.wsgi meanwhile.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from django.core.asgi import get_asgi_application
+except ImportError:
+    raise ImproperlyConfigured(
+        'ASGI requires Django 3.0 or newer; use yatube.wsgi instead'
+    ) from None
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = get_asgi_application()
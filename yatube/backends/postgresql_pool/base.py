@@ -0,0 +1,143 @@
+"""PostgreSQL с пулом соединений внутри процесса.
+
+Django держит по соединению на поток и при CONN_MAX_AGE = 0 закрывает
+его в конце каждого запроса. Этот движок вместо закрытия возвращает
+соединение в пул, а новое берёт из пула, так что установка соединения
+и аутентификация случаются только при прогреве. Число соединений
+процесса ограничено OPTIONS['pool_size'] независимо от числа потоков:
+поток, которому не хватило соединения, ждёт OPTIONS['pool_timeout']
+секунд, а потом получает OperationalError.
+
+Соединение с незавершённой транзакцией в пул не возвращается, а
+закрывается; простаивавшие дольше OPTIONS['pool_max_idle'] секунд
+тоже закрываются при выдаче, чтобы не получить обрыв от сервера.
+"""
+import queue
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+from psycopg2 import extensions
+
+POOL_OPTIONS = {
+    'pool_size': 10,
+    'pool_timeout': 30,
+    'pool_max_idle': 300,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, connect, size, timeout, max_idle):
+        self.connect = connect
+        # Последнее возвращённое соединение выдаётся первым: оно тёплое,
+        # а лишние дольше простаивают и закрываются по max_idle.
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.timeout = timeout
+        self.max_idle = max_idle
+
+    def get(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Нет свободных соединений в пуле за {self.timeout} с'
+            )
+        try:
+            while True:
+                try:
+                    connection, returned = self.idle.get_nowait()
+                except queue.Empty:
+                    return self.connect()
+                if connection.closed:
+                    continue
+                if time.monotonic() - returned > self.max_idle:
+                    connection.close()
+                    continue
+                return connection
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def close_idle(self):
+        while True:
+            try:
+                connection, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            connection.close()
+
+    def put(self, connection):
+        try:
+            if connection.closed:
+                return
+            status = connection.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_IDLE:
+                self.idle.put((connection, time.monotonic()))
+            else:
+                connection.close()
+        finally:
+            self.slots.release()
+
+
+def close_idle(alias):
+    """Закрыть простаивающие соединения пулов alias."""
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if key[0] == alias]
+    for pool in pools:
+        pool.close_idle()
+
+
+class DatabaseCreation(base.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # DROP DATABASE не пройдёт, пока в пуле есть соединения с ней.
+        close_idle(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def pool_options(self):
+        return {**POOL_OPTIONS, **self.settings_dict['OPTIONS']}
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in POOL_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def pool(self, conn_params):
+        # Параметры входят в ключ: тестовая база подключается с другим
+        # именем под тем же alias.
+        key = (self.alias, repr(sorted(conn_params.items())))
+        with _pools_lock:
+            if key not in _pools:
+                options = self.pool_options()
+                _pools[key] = ConnectionPool(
+                    lambda: base.Database.connect(**conn_params),
+                    options['pool_size'],
+                    options['pool_timeout'],
+                    options['pool_max_idle'],
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        self._pool = self.pool(conn_params)
+        connection = self._pool.get()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._pool.put(self.connection)
@@ -0,0 +1,29 @@
+"""SQLite, настроенный на одновременную работу нескольких потоков.
+
+При каждом новом соединении включаются:
+
+* journal_mode=WAL — читатели не ждут писателя и наоборот;
+* synchronous=NORMAL — в режиме WAL fsync только при контрольной
+  точке, а не на каждый COMMIT; база остаётся целой при сбое
+  процесса, при отключении питания теряются последние транзакции;
+* busy_timeout — писатель ждёт блокировку, а не падает сразу с
+  «database is locked».
+
+Настройки применяются здесь, а не в обработчике connection_created:
+обработчик зарегистрирован только после импорта своего модуля, а
+движок участвует в создании каждого соединения.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for pragma in (
+            'journal_mode = WAL',
+            'synchronous = NORMAL',
+            f'busy_timeout = {settings.SQLITE_BUSY_TIMEOUT}',
+        ):
+            connection.execute(f'PRAGMA {pragma}')
+        return connection
@@ -0,0 +1,197 @@
+"""Бэкенды кеша.
+
+MeteredCache считает попадания и промахи для метрик запроса.
+TwoTierCache — двухуровневый кеш: память процесса (L1) поверх общего
+кеша (L2).
+
+Чтение сначала идёт в L1, при промахе — в L2, найденное значение
+копируется в L1 на LOCAL_TIMEOUT секунд. Запись и удаление проходят
+сквозь оба уровня. Другие процессы увидят изменение не позже чем через
+LOCAL_TIMEOUT, поэтому его стоит держать коротким.
+
+Пример настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.TwoTierCache',
+            'OPTIONS': {'SHARED': 'shared', 'LOCAL_TIMEOUT': 5},
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/var/tmp/yatube_cache',
+        },
+    }
+"""
+from collections import Counter
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.local = LocMemCache(
+            'two-tier-{}'.format(location or self.shared_alias),
+            {
+                'TIMEOUT': self.local_timeout,
+                'OPTIONS': {
+                    'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000),
+                },
+            },
+        )
+        self.stats = Counter()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _fill_local(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_timeout = self._local_timeout(timeout)
+        if local_timeout > 0:
+            self.local.set(key, value, local_timeout, version=version)
+        else:
+            self.local.delete(key, version=version)
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            self.stats['local_hits'] += 1
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self.stats['misses'] += 1
+            return default
+        self.stats['shared_hits'] += 1
+        self._fill_local(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = self.local.get_many(keys, version=version)
+        self.stats['local_hits'] += len(found)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            self.stats['shared_hits'] += len(shared)
+            self.stats['misses'] += len(missing) - len(shared)
+            for key, value in shared.items():
+                self._fill_local(key, value, version=version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._fill_local(key, value, timeout, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._fill_local(key, value, timeout, version=version)
+        else:
+            self.local.delete(key, version=version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._fill_local(key, value, version=version)
+        return value
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version=version)
+        self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return (self.local.has_key(key, version=version)
+                or self.shared.has_key(key, version=version))
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+
+class MeteredCache(BaseCache):
+    """Обёртка над любым бэкендом, учитывающая попадания и промахи.
+
+    Счётчики попадают в метрики текущего запроса (yatube/metrics.py).
+    Настройки обёртываемого кеша передаются в OPTIONS['CACHE']::
+
+        'default': {
+            'BACKEND': 'yatube.cache.MeteredCache',
+            'OPTIONS': {'CACHE': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            }},
+        }
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        inner = dict(params.get('OPTIONS', {})['CACHE'])
+        backend = import_string(inner.pop('BACKEND'))
+        self.cache = backend(inner.get('LOCATION', ''), inner)
+
+    def __getattr__(self, name):
+        # Доступ к особым атрибутам бэкенда, например stats у TwoTierCache.
+        if name == 'cache':
+            raise AttributeError(name)
+        return getattr(self.cache, name)
+
+    def get(self, key, default=None, version=None):
+        value = self.cache.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = self.cache.get_many(keys, version=version)
+        metrics.record_cache(len(found), len(keys) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.cache.set(key, value, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.cache.set_many(data, timeout, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.cache.add(key, value, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.cache.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self.cache.incr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self.cache.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self.cache.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.cache.has_key(key, version=version)
+
+    def clear(self):
+        self.cache.clear()
+
+    def close(self, **kwargs):
+        self.cache.close(**kwargs)
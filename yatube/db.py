@@ -0,0 +1,92 @@
+"""Чтение из реплик БД с прилипанием к основной базе после записи.
+
+ReplicaRoutingMiddleware разрешает читать из реплики только внутри
+GET- и HEAD-запросов; на весь запрос выбирается одна реплика из
+DATABASE_REPLICAS, чтобы все его SELECT видели одно и то же состояние.
+Запись всегда идёт в основную базу, и после первой записи оставшиеся
+чтения того же запроса тоже идут туда. Клиенту, который что-то
+записал, ставится cookie, и следующие DATABASE_REPLICA_PIN_SECONDS
+секунд его запросы читают из основной базы: так он видит свои посты,
+комментарии и подписки, даже если реплика отстаёт.
+
+Вне запросов (команды, shell, тесты) и внутри транзакций всё читается
+из основной базы.
+
+Кеш страниц не знает об отставании реплик: если чужой запрос успеет
+прочитать реплику между правкой поста и её репликацией, старая версия
+страницы проживёт в кеше до следующей правки или PAGE_CACHE_TIMEOUT.
+Новые посты и комментарии меняют Last-Modified и ключ страницы, так что
+для них это не проблема.
+
+Пример для двух файлов SQLite::
+
+    cp db.sqlite3 replica.sqlite3
+    YATUBE_DB_REPLICAS=replica.sqlite3 python manage.py runserver
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_route = ContextVar('db_route', default=None)
+
+
+class Route:
+    """Куда читать в текущем запросе."""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def read_alias():
+    route = _route.get()
+    if route is None or route.wrote or route.replica is None:
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return route.replica
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None:
+            route.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        replica = None
+        if (replicas and request.method in SAFE_METHODS
+                and PIN_COOKIE not in request.COOKIES):
+            replica = random.choice(replicas)
+        route = Route(replica)
+        token = _route.set(route)
+        try:
+            response = self.get_response(request)
+        finally:
+            _route.reset(token)
+        if route.wrote and replicas:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,175 @@
+"""Метрики запроса: SQL, рендеринг шаблонов и кеш.
+
+RequestMetricsMiddleware собирает для каждого запроса число SQL-запросов
+и время в БД, время рендеринга шаблонов, попадания и промахи кеша и
+пишет их одной JSON-строкой в логгер yatube.requests. Запрос,
+превысивший бюджет SQL-запросов, логируется предупреждением.
+
+Те же метрики отдаются в заголовке Server-Timing (его показывают
+инструменты разработчика браузера), но только сотрудникам или всем при
+REQUEST_SERVER_TIMING = True: посторонним незачем видеть, какие адреса
+дороже обходятся базе. По умолчанию (None) заголовок включён при DEBUG.
+
+Пример настройки бюджетов::
+
+    REQUEST_QUERY_BUDGET = 15
+    REQUEST_QUERY_BUDGETS = {'post': 8, 'follow_index': 6}
+
+Время шаблонов считает бэкенд MeteredTemplates, кеш — обёртка
+yatube.cache.MeteredCache; без них соответствующие метрики равны нулю.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('yatube.requests')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка выполнения SQL для connection.execute_wrapper()."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join([
+            'db;dur={:.1f};desc="{} queries"'.format(
+                self.db_time * 1000, self.queries
+            ),
+            'tpl;dur={:.1f}'.format(self.template_time * 1000),
+            'cache;desc="{} hits, {} misses"'.format(
+                self.cache_hits, self.cache_misses
+            ),
+            'total;dur={:.1f}'.format(self.elapsed() * 1000),
+        ])
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'total_ms': round(self.elapsed() * 1000, 1),
+        }
+
+
+def current():
+    """Метрики текущего запроса или None вне RequestMetricsMiddleware."""
+    return _current.get()
+
+
+def record_cache(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+@contextmanager
+def collect():
+    """Собирать метрики всех соединений с БД внутри блока."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            yield metrics
+    finally:
+        _current.reset(token)
+
+
+def query_budget(view_name):
+    budgets = getattr(settings, 'REQUEST_QUERY_BUDGETS', {})
+    if view_name in budgets:
+        return budgets[view_name]
+    return getattr(settings, 'REQUEST_QUERY_BUDGET', None)
+
+
+def server_timing_allowed(request):
+    enabled = getattr(settings, 'REQUEST_SERVER_TIMING', None)
+    if enabled is None:
+        enabled = settings.DEBUG
+    user = getattr(request, 'user', None)
+    return enabled or (user is not None and user.is_staff)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect() as metrics:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = query_budget(view_name)
+        over_budget = budget is not None and metrics.queries > budget
+
+        if server_timing_allowed(request):
+            response['Server-Timing'] = metrics.server_timing()
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            **metrics.as_dict(),
+            'query_budget': budget,
+            'over_budget': over_budget,
+        }
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps(record, ensure_ascii=False),
+        )
+        return response
+
+
+class MeteredTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.template_time += time.perf_counter() - started
+
+
+class MeteredTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который учитывает время рендеринга.
+
+    Учитываются только шаблоны верхнего уровня: {% include %} рендерится
+    внутри них и отдельно не считается.
+    """
+
+    def from_string(self, template_code):
+        return MeteredTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return MeteredTemplate(template.template, self)
@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.RequestMetricsMiddleware',
+    'yatube.db.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,12 +63,24 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+# Загрузчики заданы явно, иначе при DEBUG=True Django не кеширует
+# скомпилированные шаблоны и разбирает post_item.html заново на каждой
+# странице. Во время правки шаблонов кеш выключается переменной
+# YATUBE_TEMPLATE_RELOAD=1.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if os.environ.get('YATUBE_TEMPLATE_RELOAD') != '1':
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.MeteredTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -83,13 +97,74 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# База задаётся переменными окружения YATUBE_DB_*. По умолчанию это файл
+# SQLite в режиме WAL (yatube/backends/sqlite3); для PostgreSQL нужен
+# psycopg2, а при YATUBE_DB_POOL_SIZE > 0 соединения берутся из пула
+# внутри процесса (yatube/backends/postgresql_pool).
+DATABASE_BACKEND = os.environ.get('YATUBE_DB_BACKEND', 'sqlite')
+DATABASE_POOL_SIZE = int(os.environ.get('YATUBE_DB_POOL_SIZE', 0))
+
+if DATABASE_BACKEND == 'postgresql':
+    DEFAULT_DATABASE = {
+        'ENGINE': (
+            'yatube.backends.postgresql_pool' if DATABASE_POOL_SIZE
+            else 'django.db.backends.postgresql'
+        ),
+        'NAME': os.environ.get('YATUBE_DB_NAME', 'yatube'),
+        'USER': os.environ.get('YATUBE_DB_USER', ''),
+        'PASSWORD': os.environ.get('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('YATUBE_DB_HOST', ''),
+        'PORT': os.environ.get('YATUBE_DB_PORT', ''),
+        # С пулом соединение возвращается в пул в конце запроса, без
+        # пула оно остаётся открытым у потока CONN_MAX_AGE секунд.
+        'CONN_MAX_AGE': int(os.environ.get(
+            'YATUBE_DB_CONN_MAX_AGE', 0 if DATABASE_POOL_SIZE else 60
+        )),
+        'OPTIONS': (
+            {'pool_size': DATABASE_POOL_SIZE} if DATABASE_POOL_SIZE else {}
+        ),
     }
+    # Реплики PostgreSQL задаются адресами серверов.
+    REPLICA_FIELD = 'HOST'
+else:
+    DEFAULT_DATABASE = {
+        'ENGINE': 'yatube.backends.sqlite3',
+        'NAME': os.path.join(
+            BASE_DIR, os.environ.get('YATUBE_DB_NAME', 'db.sqlite3')
+        ),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60)),
+    }
+    REPLICA_FIELD = 'NAME'
+
+# Сколько миллисекунд писатель SQLite ждёт блокировку базы.
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('YATUBE_SQLITE_BUSY_TIMEOUT', 5000))
+
+DATABASES = {
+    'default': DEFAULT_DATABASE,
 }
 
+# Реплики для чтения (yatube/db.py) через запятую: пути к файлам SQLite
+# или адреса серверов PostgreSQL. Запросы GET и HEAD читают из случайной
+# реплики, запись и чтение после записи идут в основную базу.
+for number, location in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+    start=1,
+):
+    if REPLICA_FIELD == 'NAME':
+        location = os.path.join(BASE_DIR, location)
+    DATABASES[f'replica{number}'] = {
+        **DEFAULT_DATABASE,
+        REPLICA_FIELD: location,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['yatube.db.ReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы.
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.environ.get('YATUBE_DB_REPLICA_PIN_SECONDS', 10)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -133,6 +208,17 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры постов готовятся в фоновом пуле потоков, см. posts/thumbnails.py
+POST_THUMBNAILS_ASYNC = True
+POST_THUMBNAIL_WORKERS = 2
+
+# Загрузки пишутся сразу на диск и обрываются при превышении размера,
+# изображения перекодируются без EXIF в ограниченном пуле, см. posts/uploads.py
+FILE_UPLOAD_HANDLERS = ['posts.uploads.LimitedUploadHandler']
+POST_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 6000 * 6000
+POST_IMAGE_ENCODERS = 2
+
 # Login
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
@@ -143,8 +229,97 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Кеш выбирается переменными окружения:
+# YATUBE_CACHE_BACKEND — locmem (по умолчанию, свой у каждого процесса),
+# file, db (таблица в основной БД, создаётся `manage.py createcachetable`),
+# redis (нужен django-redis) или memcached;
+# YATUBE_CACHE_LOCATION — каталог, таблица или адрес сервера;
+# YATUBE_CACHE_TWO_TIER=1 — читать через память процесса (L1) поверх
+# общего кеша (L2), см. yatube/cache.py.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'yatube_cache'),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211',
+    ),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.environ.get('YATUBE_CACHE_BACKEND', 'locmem')
+]
+SHARED_CACHE = {
+    'BACKEND': CACHE_BACKEND,
+    'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', CACHE_LOCATION),
+}
+
+if os.environ.get('YATUBE_CACHE_TWO_TIER') == '1':
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.TwoTierCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_TIMEOUT': int(
+                    os.environ.get('YATUBE_CACHE_LOCAL_TIMEOUT', 5)
+                ),
+            },
+        },
+        'shared': SHARED_CACHE,
     }
+else:
+    CACHES = {
+        'default': SHARED_CACHE,
+    }
+
+# Попадания и промахи кеша попадают в метрики запроса.
+CACHES['default'] = {
+    'BACKEND': 'yatube.cache.MeteredCache',
+    'OPTIONS': {'CACHE': CACHES['default']},
+}
+
+# Метрики запросов (yatube/metrics.py): число SQL-запросов, время БД,
+# шаблонов и кеша. Запросы сверх бюджета логируются предупреждением;
+# бюджет задаётся общий и по имени URL. Заголовок Server-Timing получают
+# сотрудники, а всем остальным он отдаётся только при DEBUG или
+# YATUBE_SERVER_TIMING=1.
+REQUEST_SERVER_TIMING = (
+    True if os.environ.get('YATUBE_SERVER_TIMING') == '1' else None
+)
+REQUEST_QUERY_BUDGET = 15
+REQUEST_QUERY_BUDGETS = {
+    'index': 6,
+    'group': 7,
+    'profile': 8,
+    'post': 7,
+    'post_comments': 6,
+    'follow_index': 6,
+    'search': 6,
+    'add_comment': 7,
+    'api:posts': 6,
+    'api:group_posts': 7,
+    'api:profile_posts': 7,
+    'api:follow': 6,
+    'api:post': 7,
+    'api:post_comments': 6,
+    # Импорт делает запросы на каждую порцию строк.
+    'api:import': None,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }